@@ -0,0 +1,423 @@
+"""
+Payload decoders for the typed boxes in `heic_types`.
+
+Each `parse_*` function takes a payload view with the FullBox
+version/flags prefix already stripped, plus the header fields it needs,
+and returns plain records. Keeping them free of Box state lets every
+parser share the module-level codecs below.
+"""
+
+import logging
+import struct
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from .base import BytesLike, _U16, _U32, _U64
+
+log = logging.getLogger(__name__)
+
+# Helper functions ---------------------------------------------------------
+
+_U8 = struct.Struct('>B')
+
+# Variable-width field codecs keyed by byte size (iloc/ipma/iref use 1-8 bytes).
+# Other widths (e.g. a 3-byte base_offset_size) fall back to int.from_bytes.
+_INT_CODECS = {1: _U8, 2: _U16, 4: _U32, 8: _U64}
+
+def _read_int(data: bytes, pos: int, size: int) -> int:
+    """Helper to read an integer of variable size."""
+    if size <= 0 or pos + size > len(data): return 0
+    codec = _INT_CODECS.get(size)
+    if codec is None:
+        return int.from_bytes(data[pos:pos + size], 'big')
+    return codec.unpack_from(data, pos)[0]
+
+def _make_reader(size: int) -> Callable[[BytesLike, int], int]:
+    """Resolve `_read_int` for a fixed field size once; bounds are the caller's job."""
+    if size <= 0:
+        return lambda data, pos: 0
+    codec = _INT_CODECS.get(size)
+    if codec is None:
+        return lambda data, pos: int.from_bytes(data[pos:pos + size], 'big')
+    unpack_from = codec.unpack_from
+    return lambda data, pos: unpack_from(data, pos)[0]
+
+def _make_writer(size: int) -> Callable[[bytearray, int, int], None]:
+    """Return a `pack_into`-style writer for a big-endian integer field of `size` bytes."""
+    if size <= 0:
+        return lambda buffer, pos, value: None
+    codec = _INT_CODECS.get(size)
+    if codec is None:
+        def write(buffer: bytearray, pos: int, value: int) -> None:
+            buffer[pos:pos + size] = value.to_bytes(size, 'big')
+        return write
+    return codec.pack_into
+
+@lru_cache(maxsize=256)
+def _record_array_codec(field_sizes: tuple[int, ...], count: int) -> struct.Struct:
+    """Return a cached codec for `count` records of big-endian uints with the given byte sizes."""
+    record = ''.join(_INT_CODECS[size].format[-1] for size in field_sizes)
+    return struct.Struct(f">{record * count}")
+
+@lru_cache(maxsize=256)
+def _decode_fourcc(raw: bytes) -> str:
+    """Decode a NUL-padded ASCII 4CC; item types repeat, so most calls are cache hits."""
+    return raw.strip(b'\x00').decode('ascii')
+
+def _read_cstring(data: bytes, pos: int) -> tuple[str, int]:
+    """Decode a NUL-terminated UTF-8 string; returns it with the position after the NUL."""
+    end = data.find(b'\x00', pos)
+    if end == -1: end = len(data)
+    if end == pos:
+        # Empty strings (nearly every tile item name) skip the codec call.
+        return '', min(end + 1, len(data))
+    return data[pos:end].decode('utf-8', errors='ignore'), min(end + 1, len(data))
+
+def _make_offset_remapper(regions: List[tuple[int, int, int]]) -> Callable[[int], int]:
+    """
+    Build a remapper for absolute file offsets from `(start, size, delta)` regions.
+
+    Regions are expected to be disjoint; if two share a start, the first listed wins.
+    Offsets outside every region, and offset 0 (meaning "no base"), map to themselves.
+    """
+    table: dict[int, tuple[int, int]] = {}
+    for start, size, delta in regions:
+        if delta and size > 0 and start not in table:
+            table[start] = (start + size, delta)
+    if not table:
+        # Nothing moved: every offset maps to itself.
+        return lambda offset: offset
+
+    starts = sorted(table)
+    ends = [table[start][0] for start in starts]
+    deltas = [table[start][1] for start in starts]
+
+    def remap(offset: int) -> int:
+        if offset == 0:
+            return 0
+        i = bisect_right(starts, offset) - 1
+        if i >= 0 and offset < ends[i]:
+            return offset + deltas[i]
+        return offset
+
+    return remap
+
+# ItemLocation -------------------------------------------------------------
+class ItemLocation:
+    """Represents a single `iloc` entry with all associated extents."""
+
+    __slots__ = (
+        'item_id', 'data_reference_index', 'base_offset', 'construction_method',
+        'extent_indices', 'raw_extents', 'extents',
+    )
+
+    def __init__(self, item_id, data_reference_index=0, base_offset=0, construction_method=0):
+        self.item_id = item_id
+        self.data_reference_index = data_reference_index
+        self.base_offset = base_offset
+        self.construction_method = construction_method
+        self.extent_indices = []
+        # Stored as (relative_offset, length)
+        self.raw_extents = []
+        # Stored as (absolute_offset, length)
+        self.extents = []
+
+    def __repr__(self):
+        total_length = sum(ext[1] for ext in self.extents)
+        return f"<ItemLocation ID={self.item_id} extents={len(self.extents)} total_size={total_length}>"
+
+# ItemPropertyAssociationEntry ---------------------------------------------
+class ItemPropertyAssociation:
+    __slots__ = ('property_index', 'essential')
+
+    def __init__(self, property_index: int, essential: bool):
+        self.property_index = property_index
+        self.essential = essential
+
+    def __repr__(self):
+        flag = '!' if self.essential else ''
+        return f"{flag}{self.property_index}"
+
+
+class ItemPropertyAssociationEntry:
+    __slots__ = ('item_id', 'association_count', 'associations')
+
+    def __init__(self, item_id, association_count,
+                 associations: Optional[List[ItemPropertyAssociation]] = None):
+        self.item_id = item_id
+        self.association_count = association_count
+        self.associations: List[ItemPropertyAssociation] = associations if associations is not None else []
+
+    def __repr__(self):
+        return (f"<ItemPropertyAssociationEntry item_id={self.item_id} "
+                f"associations={[repr(a) for a in self.associations]}>")
+
+# IlocTable ----------------------------------------------------------------
+@dataclass
+class IlocTable:
+    """Header fields and entries decoded from an `iloc` payload."""
+    offset_size: int
+    length_size: int
+    base_offset_size: int
+    index_size: int
+    item_count: int
+    locations: List[ItemLocation]
+
+# Decoders -----------------------------------------------------------------
+
+def parse_iloc(stream: BytesLike, version: int) -> IlocTable:
+    """Decode an `iloc` payload (version/flags already stripped)."""
+    locations: List[ItemLocation] = []
+    index_size = 0
+
+    sizes = _U16.unpack_from(stream, 0)[0]
+    offset_size = (sizes >> 12) & 0x0F
+    length_size = (sizes >> 8) & 0x0F
+    base_offset_size = (sizes >> 4) & 0x0F
+    
+    if version == 1 or version == 2:
+        index_size = sizes & 0x0F
+    
+    current_pos = 2 
+    if version < 2:
+        item_count = _U16.unpack_from(stream, 2)[0]
+        current_pos = 4
+    else: 
+        item_count = _U32.unpack_from(stream, 2)[0]
+        current_pos = 6
+
+    use_index = (version == 1 or version == 2) and index_size > 0
+    record_sizes = ((index_size,) if use_index else ()) + (offset_size, length_size)
+    record_size = sum(record_sizes)
+    # Odd or zero field widths keep the field-by-field loop below.
+    bulk_extents = all(size in _INT_CODECS for size in record_sizes)
+
+    # Field widths are fixed for the whole box: resolve each reader once.
+    item_id_size = 2 if version < 2 else 4
+    read_item_id = _make_reader(item_id_size)
+    read_base_offset = _make_reader(base_offset_size)
+    read_index = _make_reader(index_size)
+    read_offset = _make_reader(offset_size)
+    read_length = _make_reader(length_size)
+
+    # Item headers are fixed-width too: item_id, [construction_method],
+    # data_reference_index, [base_offset], extent_count. When every width
+    # has a codec, decode each header with one specialised Struct.
+    has_construction_method = version == 1 or version == 2
+    header_sizes = (
+        (item_id_size,)
+        + ((2,) if has_construction_method else ())
+        + (2,)
+        + ((base_offset_size,) if base_offset_size > 0 else ())
+        + (2,)
+    )
+    header_size = sum(header_sizes)
+    header_codec = (
+        _record_array_codec(header_sizes, 1)
+        if all(size in _INT_CODECS for size in header_sizes) else None
+    )
+    data_reference_field = 2 if has_construction_method else 1
+
+    if header_codec is not None and bulk_extents:
+        table = _parse_single_extent_table(
+            stream, current_pos, item_count, header_sizes, record_sizes,
+            has_construction_method, base_offset_size > 0, use_index,
+        )
+        if table is not None:
+            return IlocTable(offset_size, length_size, base_offset_size, index_size, item_count, table)
+
+    for _ in range(item_count):
+        if header_codec is not None:
+            # Any truncated header ends the table, as in the field-by-field path.
+            if current_pos + header_size > len(stream): break
+            fields = header_codec.unpack_from(stream, current_pos)
+            current_pos += header_size
+
+            loc = ItemLocation(fields[0])
+            if has_construction_method:
+                loc.construction_method = fields[1]
+            loc.data_reference_index = fields[data_reference_field]
+            base_offset = fields[data_reference_field + 1] if base_offset_size > 0 else 0
+            loc.base_offset = base_offset
+            extent_count = fields[-1]
+        else:
+            item_id = 0
+            if current_pos + item_id_size > len(stream): break
+            item_id = read_item_id(stream, current_pos)
+            current_pos += item_id_size
+            
+            loc = ItemLocation(item_id)
+
+            if has_construction_method and current_pos + 2 <= len(stream):
+                loc.construction_method = _U16.unpack_from(stream, current_pos)[0]
+                current_pos += 2 
+
+            if current_pos + 2 > len(stream): break 
+            loc.data_reference_index = _U16.unpack_from(stream, current_pos)[0]
+            current_pos += 2 
+            
+            base_offset = 0
+            if base_offset_size > 0:
+                if current_pos + base_offset_size > len(stream): break
+                base_offset = read_base_offset(stream, current_pos)
+                current_pos += base_offset_size
+            loc.base_offset = base_offset
+
+            if current_pos + 2 > len(stream): break
+            extent_count = _U16.unpack_from(stream, current_pos)[0]
+            current_pos += 2
+        
+        if bulk_extents:
+            # Fixed-width extent records: decode them all in one call.
+            available = min(extent_count, (len(stream) - current_pos) // record_size)
+            values = _record_array_codec(record_sizes, available).unpack_from(stream, current_pos)
+            current_pos += available * record_size
+            if use_index:
+                loc.extent_indices = list(values[0::3])
+                values = values[1:]
+            step = len(record_sizes)
+            loc.raw_extents = list(zip(values[0::step], values[1::step]))
+            loc.extents = [(base_offset + offset, length) for offset, length in loc.raw_extents]
+            if available < extent_count:
+                # Truncated payload: nothing valid can follow.
+                locations.append(loc)
+                break
+        else:
+            # extent_count is known up front: fill preallocated lists, trim on truncation.
+            raw_extents = [None] * extent_count
+            extents = [None] * extent_count
+            filled = 0
+            for __ in range(extent_count):
+                if use_index:
+                     if current_pos + index_size > len(stream): break
+                     loc.extent_indices.append(read_index(stream, current_pos))
+                     current_pos += index_size 
+
+                if current_pos + offset_size > len(stream): break
+                extent_offset = read_offset(stream, current_pos)
+                current_pos += offset_size
+
+                if current_pos + length_size > len(stream): break
+                extent_length = read_length(stream, current_pos)
+                current_pos += length_size
+                
+                raw_extents[filled] = (extent_offset, extent_length)
+                extents[filled] = (base_offset + extent_offset, extent_length)
+                filled += 1
+            if filled < extent_count:
+                del raw_extents[filled:]
+                del extents[filled:]
+            loc.raw_extents = raw_extents
+            loc.extents = extents
+        locations.append(loc)
+
+    return IlocTable(offset_size, length_size, base_offset_size, index_size, item_count, locations)
+
+def _parse_single_extent_table(
+    stream: BytesLike,
+    pos: int,
+    item_count: int,
+    header_sizes: tuple[int, ...],
+    record_sizes: tuple[int, ...],
+    has_construction_method: bool,
+    has_base_offset: bool,
+    use_index: bool,
+) -> Optional[List[ItemLocation]]:
+    """
+    Decode an iloc table in one call when every item has exactly one extent.
+
+    Returns None (caller falls back to the per-item loop) if the table does
+    not fit in `stream` or any item has a different extent count.
+    """
+    stride = len(header_sizes) + len(record_sizes)
+    if item_count == 0 or pos + item_count * (sum(header_sizes) + sum(record_sizes)) > len(stream):
+        return None
+
+    values = _record_array_codec(header_sizes + record_sizes, item_count).unpack_from(stream, pos)
+    extent_count_field = len(header_sizes) - 1
+    if values[extent_count_field::stride].count(1) != item_count:
+        return None
+
+    data_reference_field = 2 if has_construction_method else 1
+    extent_field = len(header_sizes) + (1 if use_index else 0)
+    zeros = (0,) * item_count
+    columns = zip(
+        values[0::stride],
+        values[data_reference_field::stride],
+        values[data_reference_field + 1::stride] if has_base_offset else zeros,
+        values[1::stride] if has_construction_method else zeros,
+        values[extent_field::stride],
+        values[extent_field + 1::stride],
+    )
+
+    locations: List[ItemLocation] = []
+    for item_id, data_reference_index, base_offset, method, offset, length in columns:
+        loc = ItemLocation(item_id, data_reference_index, base_offset, method)
+        loc.raw_extents = [(offset, length)]
+        loc.extents = [(base_offset + offset, length)]
+        locations.append(loc)
+    if use_index:
+        for loc, index in zip(locations, values[len(header_sizes)::stride]):
+            loc.extent_indices = [index]
+    return locations
+
+def parse_ipma(stream: BytesLike, version: int, flags: int) -> dict[int, ItemPropertyAssociationEntry]:
+    """Decode an `ipma` payload (version/flags already stripped) into item ID -> entry."""
+    entries: dict[int, ItemPropertyAssociationEntry] = {}
+    if len(stream) < 4: return entries
+    
+    try:
+        entry_count = _U32.unpack_from(stream, 0)[0]
+        pos = 4
+        item_id_size = 4 if version >= 1 else 2
+        # Entry header: item_id followed by a 1-byte association count.
+        entry_header = _record_array_codec((item_id_size, 1), 1)
+        entry_header_size = item_id_size + 1
+        is_large_property_index = (flags & 1) == 1
+        prop_size = 2 if is_large_property_index else 1
+        index_mask = 0x7FFF if is_large_property_index else 0x7F
+        essential_flag = 0x8000 if is_large_property_index else 0x80
+        
+        # Every entry needs at least its header, which bounds the loop up front.
+        entry_count = min(entry_count, (len(stream) - pos) // entry_header_size)
+        for _ in range(entry_count):
+            if pos + entry_header_size > len(stream): break
+            item_id, association_count = entry_header.unpack_from(stream, pos)
+            pos += entry_header_size
+            
+            # Decode the whole run of property indices in one call and
+            # build the association list at its final size in one pass.
+            available = min(association_count, (len(stream) - pos) // prop_size)
+            values = _record_array_codec((prop_size,), available).unpack_from(stream, pos)
+            pos += available * prop_size
+            associations = [
+                ItemPropertyAssociation(value & index_mask, (value & essential_flag) != 0)
+                for value in values
+                if value & index_mask
+            ]
+            entries[item_id] = ItemPropertyAssociationEntry(item_id, association_count, associations)
+    except struct.error:
+        log.warning("Failed to parse 'ipma' box. Content may be truncated.")
+    return entries
+
+def parse_iref_child(stream: BytesLike, ref_box_type: str, item_id_size: int) -> tuple[int, list[int]] | None:
+    """Decode one `iref` child payload into `(from_id, to_ids)`; None if unreadable."""
+    if item_id_size > len(stream):
+        log.warning("Truncated 'iref' child box '%s'. Skipping.", ref_box_type)
+        return None
+
+    # `from_item_id` and `reference_count` share one cached codec per ID width.
+    header_codec = _record_array_codec((item_id_size, 2), 1)
+    if header_codec.size > len(stream):
+        from_item_id = _INT_CODECS[item_id_size].unpack_from(stream, 0)[0]
+        log.debug("'iref' child box '%s' for ID %s has no references. Skipping.", ref_box_type, from_item_id)
+        return from_item_id, []
+
+    from_item_id, reference_count = header_codec.unpack_from(stream, 0)
+    pos = header_codec.size
+    
+    available = min(reference_count, (len(stream) - pos) // item_id_size)
+    to_item_ids = list(_record_array_codec((item_id_size,), available).unpack_from(stream, pos))
+    return from_item_id, to_item_ids
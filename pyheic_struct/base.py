@@ -1,15 +1,49 @@
 # pyheic_struct/base.py
 
-from typing import List, Optional
+from operator import attrgetter
+from typing import List, Optional, Sequence, Union
 import struct
-from io import BytesIO
+
+# Box payloads are either owned bytes or zero-copy views into the parsed file.
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Pre-compiled big-endian integer codecs shared by every box.
+_U16 = struct.Struct('>H')
+_U32 = struct.Struct('>I')
+_U64 = struct.Struct('>Q')
+
+
+def _serialised_field(slot: str) -> property:
+    """Property over `slot` for a field `build_content` writes; assigning it marks the box dirty."""
+    def fset(self, value):
+        setattr(self, slot, value)
+        self.mark_dirty()
+    return property(attrgetter(slot), fset)
 
 class Box:
-    """Generic ISOBMFF box supporting hierarchical parsing and rebuilds."""
+    """
+    Generic ISOBMFF box supporting hierarchical parsing and rebuilds.
 
-    def __init__(self, size: int, box_type: str, offset: int, raw_data: bytes):
+    `build_box` memoizes its output. Assigning a typed field that is
+    serialised (version, flags, item IDs, ...) marks the box dirty itself.
+    Code that edits anything else (the payload or nested entries) must call
+    `mark_dirty()`; adding or removing children is detected without it. Boxes keep no parent pointer: a container
+    is re-serialised whenever any box below it was.
+    """
+
+    __slots__ = (
+        'size', 'type', '_type_bytes', 'offset', 'raw_data', 'children', 'is_full_box',
+        '_dirty', '_cached_build', '_cached_children', '_data_view',
+    )
+
+    def __init__(self, size: int, box_type: str, offset: int, raw_data: BytesLike):
+        self._dirty = True
+        self._cached_build: Optional[bytes] = None
+        self._cached_children: tuple = ()
+        self._data_view: Optional[memoryview] = None
         self.size = size
         self.type = box_type
+        self._type_bytes = box_type.encode('ascii')
         self.offset = offset
         self.raw_data = raw_data
         self.children: List['Box'] = []
@@ -17,33 +51,37 @@ class Box:
 
     def __repr__(self) -> str:
         return f"<Box '{self.type}' size={self.size} offset={self.offset}>"
-        
+
+    @property
+    def data_view(self) -> memoryview:
+        """Zero-copy view of `raw_data`, created once per payload object."""
+        raw = self.raw_data
+        if isinstance(raw, memoryview):
+            return raw
+        view = self._data_view
+        if view is None or view.obj is not raw:
+            view = self._data_view = memoryview(raw)
+        return view
+
+    def mark_dirty(self):
+        """Invalidate the cached build of this box; ancestors follow on the next build."""
+        self._dirty = True
+        self._cached_build = None
+
     def _post_parse_initialization(self):
         """Called by the parser after children have been assigned."""
         pass
 
     def build_header(self, content_size: int) -> bytes:
         """Builds the 8-byte (or 16-byte) box header."""
-        header = BytesIO()
-        
         # FullBox (version/flags) 数据属于 'content', 而不是 'header'
-        full_box_header_size = 0
-        if self.is_full_box:
-            full_box_header_size = 4
-            
         final_size = 8 + content_size
         
         if final_size > 4294967295:
-            # 64-bit 'largesize'
-            header.write(struct.pack('>I', 1))
-            header.write(self.type.encode('ascii'))
-            header.write(struct.pack('>Q', final_size + 8)) # 16-byte header
-        else:
-            # 32-bit standard size
-            header.write(struct.pack('>I', final_size))
-            header.write(self.type.encode('ascii'))
-            
-        return header.getvalue()
+            # 64-bit 'largesize' (16-byte header)
+            return _U32.pack(1) + self._type_bytes + _U64.pack(final_size + 8)
+        # 32-bit standard size
+        return _U32.pack(final_size) + self._type_bytes
 
     def build_content(self) -> bytes:
         """Serialise the box payload (children included, header excluded)."""
@@ -52,70 +90,119 @@ class Box:
             return self.raw_data
         
         # Container boxes rebuild each child (including headers) in order.
-        content_stream = BytesIO()
-        for child in self.children:
-            child_data = child.build_box()
-            content_stream.write(child_data)
-        return content_stream.getvalue()
+        return self.build_container_content([child.build_box() for child in self.children])
 
+    def build_container_content(self, children_data: List[bytes]) -> bytes:
+        """Assemble a container payload from its already-built children."""
+        return b''.join(children_data)
 
-    def build_box(self) -> bytes:
-        """Construct the full box (header + payload) and return its bytes."""
-        content_data = self.build_content()
-        
+    def _is_cache_reusable(self, children_data: Sequence[bytes] = ()) -> bool:
+        """
+        Return True when the cached build can be reused, given the freshly
+        built (or reused) bytes of each child. Children may have been added,
+        removed or rebuilt on their own since this box was last built.
+        """
+        if self._dirty or self._cached_build is None:
+            return False
+        children = self.children
+        cached_children = self._cached_children
+        if len(children) != len(cached_children):
+            return False
+        for child, data, (cached_child, cached_data) in zip(children, children_data, cached_children):
+            if child is not cached_child or data is not cached_data:
+                return False
+        return True
+
+    def _store_build(self, content_data: bytes, children_data: Sequence[bytes] = ()) -> bytes:
+        """Prefix `content_data` with a header, update `size` and cache the result."""
         header_data = self.build_header(len(content_data))
         
         self.size = len(header_data) + len(content_data)
         
-        return header_data + content_data
+        box_data = header_data + content_data
+        self._cached_build = box_data
+        # Each child paired with the exact bytes this build was assembled from.
+        self._cached_children = tuple(zip(self.children, children_data))
+        self._dirty = False
+        return box_data
+
+    def build_box(self) -> bytes:
+        """Construct the full box (header + payload) and return its bytes."""
+        if not self.children:
+            if self._is_cache_reusable():
+                return self._cached_build
+            return self._store_build(self.build_content())
+
+        # Iterative post-order walk: deep trees cost no Python stack frames.
+        # `results` holds the bytes of every finished box.
+        results: List[bytes] = []
+        stack = [(self, False)]
+        while stack:
+            box, expanded = stack.pop()
+            if expanded:
+                count = len(box.children)
+                finished = results[len(results) - count:]
+                del results[len(results) - count:]
+                if box._is_cache_reusable(finished):
+                    results.append(box._cached_build)
+                else:
+                    content_data = box.build_container_content(finished)
+                    results.append(box._store_build(content_data, finished))
+            elif box.children:
+                stack.append((box, True))
+                stack.extend((child, False) for child in reversed(box.children))
+            elif box._is_cache_reusable():
+                results.append(box._cached_build)
+            else:
+                results.append(box._store_build(box.build_content()))
+        return results[0]
 
     def find_box(self, box_type: str, recursive: bool = True) -> Optional['Box']:
-        """Return the first child matching `box_type`."""
-        for child in self.children:
-            if child.type == box_type:
-                return child
-            if recursive and child.children:
-                found = child.find_box(box_type, recursive=True)
-                if found:
-                    return found
+        """Return the first descendant matching `box_type`, in document order."""
+        # Explicit stack: pre-order, so a child is checked before its subtree.
+        stack = list(reversed(self.children))
+        while stack:
+            box = stack.pop()
+            if box.type == box_type:
+                return box
+            if recursive:
+                stack.extend(reversed(box.children))
         return None
 
 class FullBox(Box):
     """Box variant that begins with a 4-byte version/flags header."""
 
-    def __init__(self, size: int, box_type: str, offset: int, raw_data: bytes):
+    __slots__ = ('_version', '_flags')
+
+    version = _serialised_field('_version')
+    flags = _serialised_field('_flags')
+
+    def __init__(self, size: int, box_type: str, offset: int, raw_data: BytesLike):
         super().__init__(size, box_type, offset, raw_data)
         self.is_full_box = True
-        self.version: int = 0
-        self.flags: int = 0
+        self._version: int = 0
+        self._flags: int = 0
         self._parse_full_box_header()
 
     def _parse_full_box_header(self):
         """Extract version and flags from the stored payload."""
         if len(self.raw_data) >= 4:
-            version_flags = struct.unpack('>I', self.raw_data[:4])[0]
-            self.version = (version_flags >> 24) & 0xFF
-            self.flags = version_flags & 0xFFFFFF
+            self._version = self.raw_data[0]
+            self._flags = int.from_bytes(self.raw_data[1:4], 'big')
         
     def build_full_box_header(self) -> bytes:
         """Serialise the 4-byte version/flags prefix."""
-        version_flags = (self.version << 24) | self.flags
-        return struct.pack('>I', version_flags)
+        return bytes((self.version,)) + self.flags.to_bytes(3, 'big')
     
     def build_content(self) -> bytes:
         """Serialise the FullBox payload, ensuring the header is emitted."""
-        content_stream = BytesIO()
-        
-        content_stream.write(self.build_full_box_header())
-        
         if not self.children:
             # Emit the payload following the version/flags header.
-            if len(self.raw_data) >= 4:
-                content_stream.write(self.raw_data[4:])
-        else:
-            # Container-style FullBoxes rebuild each descendant.
-            for child in self.children:
-                child_data = child.build_box()
-                content_stream.write(child_data)
-                
-        return content_stream.getvalue()
+            return self.build_full_box_header() + self.raw_data[4:]
+        
+        # Container-style FullBoxes rebuild each descendant.
+        return self.build_container_content([child.build_box() for child in self.children])
+
+    def build_container_content(self, children_data: List[bytes]) -> bytes:
+        """Prefix the built children with the version/flags header."""
+        return b''.join([self.build_full_box_header(), *children_data])
@@ -1,7 +1,16 @@
+import logging
 import struct
+
+from .base import Box
 from .heic_file import HEICFile
 from .heic_types import ItemLocationBox
 
+# `mdat` header: 32-bit size + type, or size=1 + type + 64-bit largesize.
+_MDAT_HEADER = struct.Struct('>I4s')
+_MDAT_LARGE_HEADER = struct.Struct('>I4sQ')
+
+log = logging.getLogger(__name__)
+
 class HEICBuilder:
     """Rebuild a HEIC container after metadata edits."""
 
@@ -23,32 +32,41 @@ class HEICBuilder:
 
         # All non-`mdat` boxes form the metadata segment.
         self.top_level_meta_boxes = [b for b in self.heic_file.boxes if b.type != 'mdat']
+        # First box of each type wins, as a forward scan would find it.
+        self._top_level_by_type: dict[str, Box] = {
+            b.type: b for b in reversed(self.top_level_meta_boxes)
+        }
+
+        # `ftyp` only has its final size once Pass 1 has built it, so the meta delta
+        # is computed on the first `iloc` rebuild and reused by the later ones.
+        self._meta_offset_delta: int | None = None
 
     def _calculate_meta_offset_delta(self) -> int:
         """Return the delta between original and rebuilt meta offsets."""
         ftyp_box = self.heic_file._ftyp_box
         if not ftyp_box:
-            ftyp_box = next((b for b in self.top_level_meta_boxes if b.type == 'ftyp'), None)
-        
+            ftyp_box = self._top_level_by_type.get('ftyp')
+
         new_meta_offset = ftyp_box.size if ftyp_box else 0 
         original_meta_offset = self.meta_box.offset
         return new_meta_offset - original_meta_offset
 
     def _rebuild_iloc_with_delta(self, mdat_offset_delta: int):
         """Rebuild the `iloc` box using the supplied `mdat` delta."""
-        print(f"  ... Rebuilding 'iloc' using mdat_delta: {mdat_offset_delta}")
-        meta_offset_delta = self._calculate_meta_offset_delta()
+        log.debug("Rebuilding 'iloc' using mdat_delta: %d", mdat_offset_delta)
+        if self._meta_offset_delta is None:
+            self._meta_offset_delta = self._calculate_meta_offset_delta()
         try:
             self.iloc_box.rebuild_iloc_content(
                 mdat_offset_delta=mdat_offset_delta,
                 original_mdat_offset=self.original_mdat_offset,
                 original_mdat_size=self.mdat_box.size,
-                meta_offset_delta=meta_offset_delta,
+                meta_offset_delta=self._meta_offset_delta,
                 original_meta_offset=self.meta_box.offset,
                 original_meta_size=self.meta_box.size
             )
         except Exception as e:
-            print(f"CRITICAL: Failed to rebuild 'iloc' box content: {e}")
+            log.error("Failed to rebuild 'iloc' box content: %s", e)
             raise
 
     def _calculate_final_meta_size(self) -> int:
@@ -63,66 +81,70 @@ class HEICBuilder:
         """Persist the rebuilt HEIC structure to `output_path`."""
 
         # Pass 1: compute a preliminary layout before touching `iloc`.
-        print("--- Builder Pass 1: Preliminary Layout ---")
-        preliminary_meta_size = self._calculate_final_meta_size()
+        log.debug("Builder pass 1: preliminary layout")
+        built_meta_size = self._calculate_final_meta_size()
+        # Offsets never change `iloc` field widths, so its rebuilt size is known now.
+        predicted_iloc_size = self.iloc_box.predict_size()
+        preliminary_meta_size = built_meta_size + predicted_iloc_size - len(self.iloc_box.build_box())
         preliminary_mdat_offset = preliminary_meta_size
         preliminary_mdat_delta = preliminary_mdat_offset - self.original_mdat_offset
         
-        print(f"Original mdat offset: {self.original_mdat_offset}")
-        print(f"Preliminary mdat offset: {preliminary_mdat_offset}")
-        print(f"Preliminary offset delta: {preliminary_mdat_delta}")
+        log.debug("Original mdat offset: %d, preliminary mdat offset: %d, delta: %d",
+                  self.original_mdat_offset, preliminary_mdat_offset, preliminary_mdat_delta)
 
         # Pass 2: rebuild `iloc` with the preliminary delta.
-        print("\n--- Builder Pass 2: Preliminary 'iloc' Rebuild ---")
+        log.debug("Builder pass 2: preliminary 'iloc' rebuild")
         self._rebuild_iloc_with_delta(preliminary_mdat_delta)
-        print(" 'iloc' preliminary rebuild complete.")
 
         # Pass 3: recalculate metadata size after the first rebuild.
-        print("\n--- Builder Pass 3: Final Layout Calculation ---")
-        final_meta_size = self._calculate_final_meta_size()
+        log.debug("Builder pass 3: final layout calculation")
+        if len(self.iloc_box.build_box()) == predicted_iloc_size:
+            # Only `iloc` changed since Pass 1, and it matches the prediction.
+            final_meta_size = preliminary_meta_size
+        else:
+            final_meta_size = self._calculate_final_meta_size()
         final_mdat_offset = final_meta_size
         final_mdat_delta = final_mdat_offset - self.original_mdat_offset
 
-        print(f"Final meta size (actual): {final_meta_size}")
-        print(f"Final mdat offset (actual): {final_mdat_offset}")
-        print(f"Final offset delta (actual): {final_mdat_delta}")
+        log.debug("Final meta size: %d, final mdat offset: %d, delta: %d",
+                  final_meta_size, final_mdat_offset, final_mdat_delta)
 
         # Pass 4: optionally rebuild with the corrected delta.
         if final_mdat_delta != preliminary_mdat_delta:
-            print("\n--- Builder Pass 4: Final 'iloc' Rebuild (Correcting Delta) ---")
+            log.debug("Builder pass 4: final 'iloc' rebuild (correcting delta)")
             self._rebuild_iloc_with_delta(final_mdat_delta)
-            print(" 'iloc' final rebuild complete.")
         else:
-            print("\n--- Builder Pass 4: Skipped (Preliminary delta was correct) ---")
+            log.debug("Builder pass 4: skipped (preliminary delta was correct)")
 
         # Pass 5: write metadata followed by `mdat`.
-        print("\n--- Builder Pass 5: Rebuild & Write ---")
-        with open(output_path, 'wb') as f:
+        log.debug("Builder pass 5: rebuild & write")
+        # The metadata segment and the `mdat` header go out in one write, then the payload.
+        meta_parts = []
+        current_offset = 0
+        debug = log.isEnabledFor(logging.DEBUG)
+        for box in self.top_level_meta_boxes:
+            final_box_data = box.build_box()
+            meta_parts.append(final_box_data)
+            current_offset += len(final_box_data)
+            if debug:
+                log.debug("Wrote '%s' (final size: %d)", box.type, len(final_box_data))
 
-            current_offset = 0
-            for box in self.top_level_meta_boxes:
-                final_box_data = box.build_box()
-                f.write(final_box_data)
-                current_offset += len(final_box_data)
-                print(f"Wrote '{box.type}' (final size: {len(final_box_data)})")
+        if current_offset != final_mdat_offset:
+            log.warning("Final meta size (%d) does not match calculated mdat offset (%d)",
+                        current_offset, final_mdat_offset)
 
-            if current_offset != final_mdat_offset:
-                print(f"WARNING: Final meta size ({current_offset}) does not match"
-                      f" calculated mdat offset ({final_mdat_offset})!")
+        mdat_data = self.mdat_box.raw_data
+        mdat_size = 8 + len(mdat_data)  # 8-byte header
 
-            mdat_data = self.mdat_box.raw_data
-            mdat_size = 8 + len(mdat_data)  # 8-byte header
+        log.debug("Writing 'mdat' (final size: %d) at offset %d", mdat_size, current_offset)
 
-            print(f"Writing 'mdat' (final size: {mdat_size}) at offset {current_offset}...")
-            
-            if mdat_size > 4294967295:
-                f.write(struct.pack('>I', 1))
-                f.write(b'mdat')
-                f.write(struct.pack('>Q', mdat_size))
-            else:
-                f.write(struct.pack('>I', mdat_size))
-                f.write(b'mdat')
-            
+        if mdat_size > 4294967295:
+            meta_parts.append(_MDAT_LARGE_HEADER.pack(1, b'mdat', mdat_size + 8))
+        else:
+            meta_parts.append(_MDAT_HEADER.pack(mdat_size, b'mdat'))
+
+        with open(output_path, 'wb') as f:
+            f.write(b''.join(meta_parts))
             f.write(mdat_data)
 
-        print(f"\nSuccessfully rebuilt file at: {output_path}")
+        log.debug("Successfully rebuilt file at: %s", output_path)
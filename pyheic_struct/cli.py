@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import argparse
+import logging
 from pathlib import Path
 
 from .converter import convert_samsung_motion_photo
@@ -30,11 +31,19 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Skip injecting the ContentIdentifier into the MOV file (no exiftool call).",
     )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Print the step-by-step conversion and rebuild log.",
+    )
     return parser
 
 
 def main(argv: list[str] | None = None) -> None:
     args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+
     convert_samsung_motion_photo(
         args.source,
         output_still=args.output_heic,
@@ -2,13 +2,14 @@
 
 from __future__ import annotations
 
+import logging
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from typing import Optional, Union
 
-import pillow_heif
-
 from .builder import HEICBuilder
 from .handlers import VendorHandler, get_handler_by_name, resolve_handler
 from .heic_file import HEICFile
@@ -17,6 +18,8 @@ from .targets import AppleTargetAdapter, TargetAdapter
 
 HandlerHint = Union[str, VendorHandler, None]
 
+log = logging.getLogger(__name__)
+
 
 def _select_handler(
     heic_file: HEICFile,
@@ -37,9 +40,9 @@ def _select_handler(
         handler = heic_file.handler or resolve_handler(heic_file)
 
     if not handler.__class__.matches(heic_file):
-        print(
-            f"Warning: Handler '{handler.name}' did not positively match heuristics for this file. "
-            "Proceeding anyway."
+        log.warning(
+            "Handler '%s' did not positively match heuristics for this file. Proceeding anyway.",
+            handler.name,
         )
 
     if not handler.supports_target(target_adapter):
@@ -59,6 +62,7 @@ def convert_motion_photo(
     output_still: Optional[str | os.PathLike] = None,
     output_video: Optional[str | os.PathLike] = None,
     inject_content_id_into_mov: bool = True,
+    reencode_primary: bool = True,
 ) -> tuple[Path, Optional[Path]]:
     """
     Convert a Motion Photo HEIC into a target-compatible HEIC(+MOV) 组合。
@@ -78,6 +82,10 @@ def convert_motion_photo(
         可选的输出 MOV 路径，默认 ``<source>_apple_compatible.MOV``。
     inject_content_id_into_mov:
         是否在 MOV 文件中写入 ``ContentIdentifier``。
+    reencode_primary:
+        为 ``True``（默认）时用 pillow-heif 解码主图像并重新编码为扁平 HEIC；
+        为 ``False`` 时直接复用原文件中已编码的 HEVC 瓦片，只改写元数据盒，
+        跳过解码与重新编码。
 
     Returns
     -------
@@ -94,91 +102,97 @@ def convert_motion_photo(
     base = source_path.with_suffix("")
     heic_path = Path(output_still) if output_still else Path(f"{base}_apple_compatible.HEIC")
     mov_output_path = Path(output_video) if output_video else Path(f"{base}_apple_compatible.MOV")
-    temp_flat_path = Path(f"{base}_temp_flat.HEIC")
 
-    print(f"--- Converting {source_path.name} using target '{target_adapter.name}' ---")
-
-    original_heic_file = HEICFile(str(source_path))
-    handler = _select_handler(original_heic_file, vendor_hint, target_adapter)
+    log.info("Converting %s using target '%s'", source_path.name, target_adapter.name)
+
+    with HEICFile(str(source_path)) as original_heic_file:
+        handler = _select_handler(original_heic_file, vendor_hint, target_adapter)
+
+        log.debug("Detected handler: %s", handler.name)
+
+        pil_image = None
+        if reencode_primary:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                # The MOV copy only touches the embedded video range and releases the GIL
+                # while writing, so it runs alongside the HEVC decode of the primary image.
+                video_export = pool.submit(handler.export_motion_video, original_heic_file, mov_output_path)
+
+                log.debug("Reconstructing primary image using vendor handler...")
+                try:
+                    pil_image = handler.reconstruct_primary_image(original_heic_file)
+                except BaseException:
+                    # Wait for the export without re-raising its own error over this one.
+                    if video_export.exception() is None and video_export.result():
+                        mov_output_path.unlink(missing_ok=True)
+                    raise
+                video_exported = video_export.result()
+
+            if pil_image is None:
+                if video_exported:
+                    mov_output_path.unlink(missing_ok=True)
+                raise RuntimeError("Failed to reconstruct primary image using pillow-heif.")
+        else:
+            log.debug("Reusing the original coded image data (no decode / re-encode).")
+            video_exported = handler.export_motion_video(original_heic_file, mov_output_path)
+
+        new_content_id = str(uuid.uuid4()).upper()
+        photo_identifier = str(uuid.uuid4()).upper()
+        log.debug("Generated ContentIdentifier: %s, PhotoIdentifier: %s", new_content_id, photo_identifier)
+
+        mov_path: Optional[Path]
+        if video_exported:
+            log.debug("Saved embedded motion photo video to %s.", mov_output_path)
+            target_adapter.post_process_mov(
+                mov_output_path,
+                new_content_id,
+                inject_content_id_into_mov,
+            )
+            mov_path = mov_output_path
+        else:
+            mov_path = None
+            log.debug("No embedded motion photo data found via handler; no MOV will be exported.")
+
+        if pil_image is not None:
+            try:
+                # The flat HEIC is only an intermediate: encode it in memory, never on disk.
+                log.debug("Encoding flat HEIC in memory...")
+                flat_buffer = BytesIO()
+                pil_image.save(
+                    flat_buffer,
+                    format="HEIF",
+                    quality=95,
+                    save_as_brand="mif1",
+                )
+                flat_data = flat_buffer.getvalue()
+            except Exception as exc:
+                raise RuntimeError(f"Failed to encode flat HEIC: {exc}") from exc
+        else:
+            flat_data = original_heic_file.to_bytes()
 
-    print(f"Detected handler: {handler.name}")
+        log.debug("Loading flat HEIC for metadata transformation...")
+        with HEICFile.from_bytes(flat_data) as flat_heic_file:
+            if pil_image is None:
+                # The video now lives in the exported MOV; drop the embedded copy.
+                flat_heic_file.remove_box_by_type("mpvd")
 
-    video_data = handler.extract_motion_video(original_heic_file)
-    if video_data:
-        print("Embedded motion photo data detected.")
-    else:
-        print("No embedded motion photo data found via handler.")
-
-    print("Reconstructing primary image using vendor handler...")
-    pil_image = handler.reconstruct_primary_image(original_heic_file)
-    if pil_image is None:
-        raise RuntimeError("Failed to reconstruct primary image using pillow-heif.")
-
-    new_content_id = str(uuid.uuid4()).upper()
-    photo_identifier = str(uuid.uuid4()).upper()
-    print(f"Generated ContentIdentifier: {new_content_id}")
-    print(f"Generated PhotoIdentifier:   {photo_identifier}")
-
-    mov_path: Optional[Path]
-    if video_data:
-        print(f"Saving extracted video data to {mov_output_path}...")
-        mov_output_path.write_bytes(video_data)
-        target_adapter.post_process_mov(
-            mov_output_path,
-            new_content_id,
-            inject_content_id_into_mov,
-        )
-        mov_path = mov_output_path
-    else:
-        mov_path = None
-        print("Info: No motion photo data will be exported as MOV.")
-
-    try:
-        print(f"Saving temporary flat HEIC file to {temp_flat_path}...")
-        pillow_heif.register_heif_opener()
-        pil_image.save(
-            temp_flat_path,
-            format="HEIF",
-            quality=95,
-            save_as_brand="mif1",
-        )
-        print("Successfully created temporary flat HEIC.")
-    except Exception as exc:
-        if temp_flat_path.exists():
-            temp_flat_path.unlink()
-        raise RuntimeError(f"Failed to save temporary HEIC file: {exc}") from exc
-
-    try:
-        print("Loading temporary flat HEIC for metadata transformation...")
-        flat_heic_file = HEICFile(str(temp_flat_path))
-
-        handler.prepare_flat_heic(
-            original_heic=original_heic_file,
-            flat_heic=flat_heic_file,
-            content_id=new_content_id,
-            target_adapter=target_adapter,
-        )
-
-        target_adapter.apply_to_flat_heic(
-            flat_heic_file,
-            new_content_id,
-            photo_identifier,
-        )
+            handler.prepare_flat_heic(
+                original_heic=original_heic_file,
+                flat_heic=flat_heic_file,
+                content_id=new_content_id,
+                target_adapter=target_adapter,
+            )
 
-        print("Rebuilding flat HEIC with new metadata...")
-        builder = HEICBuilder(flat_heic_file)
-        builder.write(str(heic_path))
+            target_adapter.apply_to_flat_heic(
+                flat_heic_file,
+                new_content_id,
+                photo_identifier,
+            )
 
-    finally:
-        if temp_flat_path.exists():
-            temp_flat_path.unlink()
-            print(f"Cleaned up temporary file: {temp_flat_path}")
+            log.debug("Rebuilding flat HEIC with new metadata...")
+            builder = HEICBuilder(flat_heic_file)
+            builder.write(str(heic_path))
 
-    print("--- Conversion complete ---")
-    print(f"New HEIC: {heic_path}")
-    if mov_path:
-        print(f"New MOV:  {mov_path}")
-    print("\n" + "=" * 40 + "\n")
+    log.info("Conversion complete. New HEIC: %s, new MOV: %s", heic_path, mov_path)
 
     return heic_path, mov_path
 
@@ -189,6 +203,7 @@ def convert_samsung_motion_photo(
     output_still: Optional[str | os.PathLike] = None,
     output_video: Optional[str | os.PathLike] = None,
     inject_content_id_into_mov: bool = True,
+    reencode_primary: bool = True,
 ) -> tuple[Path, Optional[Path]]:
     """
     Backwards-compatible Samsung 转换入口，等价于 `vendor_hint="samsung"`。
@@ -199,4 +214,5 @@ def convert_samsung_motion_photo(
         output_still=output_still,
         output_video=output_video,
         inject_content_id_into_mov=inject_content_id_into_mov,
+        reencode_primary=reencode_primary,
     )
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 from typing import TYPE_CHECKING
 
 from .base_handler import VendorHandler
@@ -8,6 +9,8 @@ if TYPE_CHECKING:
     from ..heic_file import HEICFile
     from ..targets.base import TargetAdapter
 
+log = logging.getLogger(__name__)
+
 
 class AppleHandler(VendorHandler):
     """
@@ -27,7 +30,7 @@ class AppleHandler(VendorHandler):
         return any(brand in {"heic", "mif1", "mihb", "mihe"} for brand in brands)
 
     def find_motion_photo_offset(self, heic_file: HEICFile) -> int | None:
-        print("Apple HEIC detected. Motion photo video is in a separate .mov file, not embedded.")
+        log.debug("Apple HEIC detected. Motion photo video is in a separate .mov file, not embedded.")
         return None
 
     def supports_target(self, target_adapter: TargetAdapter) -> bool:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from abc import ABC
 from typing import TYPE_CHECKING, Optional
 
@@ -14,7 +15,7 @@ class VendorHandler(ABC):
 
     设计理念：
     - `matches` 用于自动检测厂商；
-    - `extract_motion_video` 负责读取嵌入式视频；
+    - `extract_motion_video` 负责读取嵌入式视频，`export_motion_video` 将其直接写入文件；
     - `prepare_flat_heic` 提供对中间平面 HEIC 的修复机会；
     - 其余钩子可在必要时扩展。
     """
@@ -41,17 +42,38 @@ class VendorHandler(ABC):
         """
         return None
 
-    def extract_motion_video(self, heic_file: HEICFile) -> Optional[bytes]:
+    def find_motion_photo_range(self, heic_file: HEICFile) -> tuple[int, int | None] | None:
         """
-        读取嵌入式视频数据。若无法定位则返回 None。
+        返回嵌入式视频的 `(offset, length)`。
+        默认基于 `find_motion_photo_offset`，长度为 None 表示读取至文件末尾。
         """
         offset = self.find_motion_photo_offset(heic_file)
         if offset is None:
             return None
+        return offset, None
+
+    def extract_motion_video(self, heic_file: HEICFile) -> Optional[bytes]:
+        """
+        读取嵌入式视频数据。若无法定位则返回 None。
+        """
+        video_range = self.find_motion_photo_range(heic_file)
+        if video_range is None:
+            return None
+
+        offset, length = video_range
+        return heic_file._read_range(offset, length)
+
+    def export_motion_video(self, heic_file: HEICFile, destination: str | os.PathLike) -> bool:
+        """
+        将嵌入式视频直接写入 `destination`，不在内存中另存一份副本。
+        返回是否写出了数据；覆盖了 `extract_motion_video` 的子类也应覆盖本方法。
+        """
+        video_range = self.find_motion_photo_range(heic_file)
+        if video_range is None:
+            return False
 
-        with open(heic_file.filepath, "rb") as file_obj:
-            file_obj.seek(offset)
-            return file_obj.read()
+        offset, length = video_range
+        return heic_file._copy_range_to(offset, length, destination) > 0
 
     def reconstruct_primary_image(self, heic_file: HEICFile):
         """
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 from typing import TYPE_CHECKING
 
 from .base_handler import VendorHandler
@@ -9,6 +10,8 @@ if TYPE_CHECKING:
     from ..heic_file import HEICFile
     from ..targets.base import TargetAdapter
 
+log = logging.getLogger(__name__)
+
 
 class SamsungHandler(VendorHandler):
     """Handles Samsung-specific HEIC features, like the embedded mpvd box."""
@@ -30,14 +33,22 @@ class SamsungHandler(VendorHandler):
         """
         Searches for the 'mpvd' box which contains the video data.
         """
+        video_range = self.find_motion_photo_range(heic_file)
+        return video_range[0] if video_range else None
+
+    def find_motion_photo_range(self, heic_file: HEICFile) -> tuple[int, int] | None:
+        """
+        Returns the exact `(offset, length)` of the mpvd payload.
+        """
         mpvd_box = heic_file.find_box("mpvd")
-        if mpvd_box:
-            print(f"Samsung 'mpvd' box found at offset {mpvd_box.offset}")
-            # 视频数据在 8 字节头部之后开始
-            return mpvd_box.offset + 8
+        if not mpvd_box:
+            log.debug("Samsung HEIC detected, but no 'mpvd' box found.")
+            return None
 
-        print("Samsung HEIC detected, but no 'mpvd' box found.")
-        return None
+        log.debug("Samsung 'mpvd' box found at offset %s", mpvd_box.offset)
+        # 头部可能是 8 字节或 16 字节 (largesize)，由解析后的负载长度推算
+        length = len(mpvd_box.raw_data)
+        return mpvd_box.offset + mpvd_box.size - length, length
 
     def prepare_flat_heic(
         self,
@@ -53,53 +64,72 @@ class SamsungHandler(VendorHandler):
         if not (flat_heic._iinf_box and flat_heic._iloc_box and flat_heic._iprp_box):
             return
 
-        correct_ids = {loc.item_id for loc in flat_heic._iloc_box.locations}
-        iinf_children_to_fix = [
-            child
+        correct_ids = flat_heic._iloc_box.item_ids
+        # One flat shifted -> unshifted map, applied in a single sweep per container.
+        shifted_id_map: dict[int, int] = {
+            child.item_id: child.item_id >> 16
             for child in flat_heic._iinf_box.children
-            if isinstance(child, ItemInfoEntryBox) and (child.item_id >> 16) in correct_ids
-        ]
+            if isinstance(child, ItemInfoEntryBox)
+            and (child.item_id >> 16) in correct_ids
+            and child.item_id != child.item_id >> 16
+        }
+
+        if not shifted_id_map:
+            # Nothing to remap: ipma and iref are left untouched.
+            log.debug("'infe' boxes seem correct. No shift detected.")
+            return
 
-        shifted_id_map: dict[int, int] = {}
+        log.debug("Found %s shifted 'infe' boxes. Mapping IDs for reference...", len(shifted_id_map))
+        for shifted_id, unshifted_id in shifted_id_map.items():
+            log.debug("Mapping 'infe' ID %s -> %s", shifted_id, unshifted_id)
 
-        if iinf_children_to_fix:
-            print(f"  Found {len(iinf_children_to_fix)} shifted 'infe' boxes. Mapping IDs for reference...")
-            for infe_box in iinf_children_to_fix:
-                unshifted_id = infe_box.item_id >> 16
-                if unshifted_id in correct_ids:
-                    shifted_id_map[infe_box.item_id] = unshifted_id
-                    print(f"  - Mapping 'infe' ID {infe_box.item_id} -> {unshifted_id}")
-        else:
-            print("  'infe' boxes seem correct. No shift detected.")
+        flat_heic._invalidate_item_caches()
 
-        if shifted_id_map and flat_heic._iprp_box.ipma:
-            ipma_entries = flat_heic._iprp_box.ipma.entries
-            keys_to_fix = [key for key in ipma_entries if key in shifted_id_map]
+        if flat_heic._iprp_box.ipma:
+            ipma = flat_heic._iprp_box.ipma
+            ipma_entries = ipma.entries
+            keys_to_fix = (
+                [] if ipma_entries.keys().isdisjoint(shifted_id_map)
+                else [key for key in ipma_entries if key in shifted_id_map]
+            )
 
             if keys_to_fix:
-                print(f"  Found {len(keys_to_fix)} shifted 'ipma' entries. Fixing them...")
+                log.debug("Found %s shifted 'ipma' entries. Fixing them...", len(keys_to_fix))
+                for shifted_key in keys_to_fix:
+                    log.debug("Fixing 'ipma' key %s -> %s", shifted_key, shifted_id_map[shifted_key])
+                ipma.entries = _remap_keys(ipma_entries, shifted_id_map, keys_to_fix)
                 for shifted_key in keys_to_fix:
-                    correct_key = shifted_id_map[shifted_key]
-                    print(f"  - Fixing 'ipma' key {shifted_key} -> {correct_key}")
-                    entry_data = ipma_entries.pop(shifted_key)
-                    entry_data.item_id = correct_key
-                    ipma_entries[correct_key] = entry_data
+                    ipma.entries[shifted_id_map[shifted_key]].item_id = shifted_id_map[shifted_key]
+                ipma.mark_dirty()
             else:
-                print(f"  'ipma' entries seem correct. (Keys: {list(ipma_entries.keys())})")
+                log.debug("'ipma' entries seem correct. (Keys: %s)", list(ipma_entries.keys()))
 
-        if shifted_id_map and flat_heic._iref_box:
+        if flat_heic._iref_box:
             iref_refs = flat_heic._iref_box.references
+            shifted_ids = shifted_id_map.keys()
             refs_fixed = 0
-            for ref_type in list(iref_refs.keys()):
-                keys_to_fix = [key for key in iref_refs[ref_type] if key in shifted_id_map]
+            for ref_type, refs in iref_refs.items():
+                if refs.keys().isdisjoint(shifted_ids):
+                    continue
+                keys_to_fix = [key for key in refs if key in shifted_id_map]
                 if keys_to_fix:
                     refs_fixed += len(keys_to_fix)
                     for shifted_key in keys_to_fix:
-                        correct_key = shifted_id_map[shifted_key]
-                        print(f"  - Fixing 'iref' key [{ref_type}] {shifted_key} -> {correct_key}")
-                        iref_refs[ref_type][correct_key] = iref_refs[ref_type].pop(shifted_key)
+                        log.debug("Fixing 'iref' key [%s] %s -> %s", ref_type, shifted_key, shifted_id_map[shifted_key])
+                    iref_refs[ref_type] = _remap_keys(refs, shifted_id_map, keys_to_fix)
 
             if refs_fixed > 0:
-                print(f"  Fixed {refs_fixed} 'iref' entries.")
+                log.debug("Fixed %s 'iref' entries.", refs_fixed)
             else:
-                print("  'iref' entries seem correct.")
+                log.debug("'iref' entries seem correct.")
+
+
+def _remap_keys(mapping: dict, id_map: dict[int, int], shifted_keys: list[int]) -> dict:
+    """
+    Rebuild `mapping` with `id_map` applied to its keys, keeping entry order.
+    On a collision the remapped (shifted) entry wins, as the old pop/insert fix did.
+    """
+    remapped = {id_map.get(key, key): value for key, value in mapping.items()}
+    for shifted_key in shifted_keys:
+        remapped[id_map[shifted_key]] = mapping[shifted_key]
+    return remapped
@@ -1,12 +1,15 @@
+import logging
 import os
 import math
 import pillow_heif
+from collections import defaultdict, deque
 from dataclasses import dataclass
+from io import BytesIO
 from typing import Optional
 from PIL import Image
 
 from .base import Box
-from .parser import parse_boxes
+from .parser import parse_buffer
 from .heic_types import (
     ItemLocationBox,
     PrimaryItemBox,
@@ -16,10 +19,37 @@ from .heic_types import (
     ItemReferenceBox,
     ItemInfoEntryBox,
     ItemLocation,
-    _read_int,
 )
+from ._parsers import _read_int
 from .handlers import VendorHandler, resolve_handler
 
+log = logging.getLogger(__name__)
+
+# Let PIL open HEIF data; registered once per process, not per file.
+pillow_heif.register_heif_opener()
+
+# Typed boxes cached as `HEICFile` shortcut attributes.
+_ESSENTIAL_BOX_SLOTS = {
+    ItemLocationBox: '_iloc_box',
+    ItemInfoBox: '_iinf_box',
+    PrimaryItemBox: '_pitm_box',
+    ItemPropertiesBox: '_iprp_box',
+    ItemReferenceBox: '_iref_box',
+}
+
+def _parse_brands(raw: bytes) -> frozenset[str]:
+    """Decode the major and compatible brands of an `ftyp` payload."""
+    # Major brand, then compatible brands after the 4-byte minor version.
+    codes = {raw[:4]} if len(raw) >= 4 else set()
+    end = 8 + max(len(raw) - 8, 0) // 4 * 4
+    codes.update(raw[offset:offset + 4] for offset in range(8, end, 4))
+    brands = {
+        bytes(code).lower().decode("ascii", errors="ignore").strip("\x00")
+        for code in codes
+    }
+    brands.discard("")
+    return frozenset(brands)
+
 @dataclass
 class Grid:
     rows: int
@@ -30,9 +60,9 @@ class Grid:
 class HEICFile:
     """High-level accessor for parsed HEIC/HEIF structures."""
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str | None, *, data: bytes | None = None):
+        # `filepath` is None for files built by `from_bytes`; `data` is then the only copy.
         self.filepath = filepath
-        pillow_heif.register_heif_opener()
         
         self._iloc_box: ItemLocationBox | None = None
         self._ftyp_box: Box | None = None
@@ -42,40 +72,172 @@ class HEICFile:
         self._iref_box: ItemReferenceBox | None = None
         self.handler: VendorHandler | None = None
         self.boxes: list[Box] = []  # Top-level boxes
+        self._box_index: dict[str, list[Box]] = {}
+        self._brands: frozenset[str] = frozenset()
+        self._brands_source: bytes | None = None
+        self._iloc_by_id: dict[int, ItemLocation] = {}
+        self._iloc_by_id_source: list[ItemLocation] | None = None
+        self._image_size_cache: dict[int, tuple[int, int] | None] = {}
+        self._grid_layout_cache: dict[int, list[int] | None] = {}
+        self._ispe_by_index: dict[int, ImageSpatialExtentsBox] | None = None
+        self._primary_image: Image.Image | None = None
+        # Whole-file buffer; box payloads are zero-copy views into it.
+        self._data: bytes | None = None
+        # Source size, recorded once; still valid after `close()` drops `_data`.
+        self._file_size: int = 0
 
         try:
-            with open(self.filepath, 'rb') as f:
-                file_size = os.fstat(f.fileno()).st_size
-                self.boxes = parse_boxes(f, file_size)
-                self._find_essential_boxes(self.boxes)
-                self._detect_vendor()
+            if data is not None:
+                self._data = data
+            else:
+                with open(self.filepath, 'rb') as f:
+                    file_size = os.fstat(f.fileno()).st_size
+                    self._data = f.read(file_size)
+            self._file_size = len(self._data)
+            self.boxes = parse_buffer(self._data)
+            self._index_boxes()
+            self._find_essential_boxes(self.boxes)
+            self._detect_vendor()
         except Exception as e:
-            print(f"CRITICAL ERROR during file parsing: {e}")
+            log.error("Critical error during file parsing: %s", e)
+            self.close()
             raise
 
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HEICFile":
+        """Parse a HEIC that only exists in memory (e.g. freshly encoded by pillow-heif)."""
+        return cls(None, data=data)
+
+    def close(self) -> None:
+        """
+        Drop the file buffer. Later item reads fall back to reopening the file;
+        parsed boxes keep the views they already hold. In-memory files keep
+        their buffer, since there is no file to reopen.
+        """
+        if self.filepath is not None:
+            self._data = None
+
+    def to_bytes(self) -> bytes:
+        """The whole source file: the loaded buffer, or a fresh read after `close()`."""
+        if self._data is not None:
+            return self._data
+        with open(self.filepath, 'rb') as f:
+            return f.read()
+
+    def __enter__(self) -> "HEICFile":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _read_extents(self, extents: list[tuple[int, int]]) -> bytes:
+        """Concatenate `(offset, length)` ranges of the source file."""
+        if len(extents) == 1 and self._data is not None:
+            # Common case for unfragmented items: a single slice, no join.
+            offset, length = extents[0]
+            return self._data[offset:offset + length]
+
+        if self._data is None:
+            with open(self.filepath, 'rb') as f:
+                chunks = []
+                for offset, length in extents:
+                    f.seek(offset)
+                    chunks.append(f.read(length))
+                return b''.join(chunks)
+
+        # Slicing a memoryview avoids an intermediate copy per extent.
+        view = memoryview(self._data)
+        return b''.join([view[offset:offset + length] for offset, length in extents])
+
+    def _read_range(self, offset: int, length: int | None = None) -> bytes:
+        """Read `length` bytes (or everything up to EOF) starting at `offset`."""
+        if length is not None:
+            return self._read_extents([(offset, length)])
+        if self._data is None:
+            with open(self.filepath, 'rb') as f:
+                f.seek(offset)
+                return f.read()
+        return self._data[offset:]
+
+    def _copy_range_to(self, offset: int, length: int | None, destination: str | os.PathLike) -> int:
+        """
+        Write `length` bytes (or everything up to EOF) starting at `offset` to
+        `destination` without materialising them as a new bytes object.
+        Returns the number of bytes written; nothing is created when that is 0.
+        """
+        available = max(0, self._file_size - offset)
+        length = available if length is None else max(0, min(length, available))
+        if length == 0:
+            return 0
+
+        with open(destination, 'wb') as dst:
+            if self._data is not None:
+                # Zero-copy: the kernel reads straight from the loaded buffer.
+                dst.write(memoryview(self._data)[offset:offset + length])
+                return length
+
+            with open(self.filepath, 'rb') as src:
+                written = 0
+                if hasattr(os, 'sendfile'):
+                    try:
+                        while written < length:
+                            sent = os.sendfile(dst.fileno(), src.fileno(), offset + written, length - written)
+                            if sent == 0:
+                                break
+                            written += sent
+                        return written
+                    except OSError:
+                        # Platforms that only sendfile to sockets; restart with plain reads.
+                        dst.seek(0)
+                        dst.truncate()
+                        written = 0
+                src.seek(offset)
+                while written < length:
+                    chunk = src.read(min(1 << 20, length - written))
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    written += len(chunk)
+                return written
+
     def _find_essential_boxes(self, boxes: list[Box]):
-        """Populate shortcut pointers for commonly used boxes."""
-        for box in boxes:
-            if isinstance(box, ItemLocationBox): self._iloc_box = box
-            if isinstance(box, ItemInfoBox): self._iinf_box = box
-            if isinstance(box, PrimaryItemBox): self._pitm_box = box
-            if isinstance(box, ItemPropertiesBox): self._iprp_box = box
-            if isinstance(box, ItemReferenceBox): self._iref_box = box
-            if box.type == 'ftyp': self._ftyp_box = box
-            if box.children: self._find_essential_boxes(box.children)
+        """Populate shortcut pointers for commonly used boxes (breadth-first)."""
+        remaining = len(_ESSENTIAL_BOX_SLOTS)
+        queue = deque(boxes)
+        while queue:
+            box = queue.popleft()
+            slot = _ESSENTIAL_BOX_SLOTS.get(type(box))
+            if slot and getattr(self, slot) is None:
+                setattr(self, slot, box)
+                remaining -= 1
+            elif box.type == 'ftyp' and self._ftyp_box is None:
+                self._ftyp_box = box
+            if remaining == 0 and self._ftyp_box is not None:
+                break
+            queue.extend(box.children)
+
+    def _index_boxes(self):
+        """Map every fourcc to its boxes, in depth-first (document) order."""
+        index: dict[str, list[Box]] = defaultdict(list)
+        stack = list(reversed(self.boxes))
+        while stack:
+            box = stack.pop()
+            index[box.type].append(box)
+            stack.extend(reversed(box.children))
+        self._box_index = dict(index)
 
     def find_box(self, box_type: str, root_box_list: list[Box] | None = None) -> Box | None:
-        """Recursively locate the first box with the requested fourcc."""
+        """Locate the first box with the requested fourcc."""
         if root_box_list is None:
-            root_box_list = self.boxes
+            boxes = self._box_index.get(box_type)
+            return boxes[0] if boxes else None
             
         for box in root_box_list:
             if box.type == box_type:
                 return box
-            if box.children:
-                found = self.find_box(box_type, root_box_list=box.children)
-                if found:
-                    return found
+            found = box.find_box(box_type)
+            if found:
+                return found
         return None
 
     def get_mdat_box(self) -> Box | None:
@@ -85,31 +247,20 @@ class HEICFile:
                 return box
         return None
 
-    def get_compatible_brands(self) -> set[str]:
+    def get_compatible_brands(self) -> frozenset[str]:
         """
         Return the normalized set of brands listed in the `ftyp` box.
+
+        The set is cached until the `ftyp` payload is replaced.
         """
         if not self._ftyp_box or not self._ftyp_box.raw_data:
-            return set()
+            return frozenset()
 
         raw = self._ftyp_box.raw_data
-        brands: set[str] = set()
-
-        if len(raw) >= 4:
-            primary = raw[:4].decode("ascii", errors="ignore").strip("\x00").lower()
-            if primary:
-                brands.add(primary)
-
-        # Skip 4-byte minor version
-        for offset in range(8, len(raw), 4):
-            chunk = raw[offset:offset + 4]
-            if len(chunk) < 4:
-                break
-            brand = chunk.decode("ascii", errors="ignore").strip("\x00").lower()
-            if brand:
-                brands.add(brand)
-
-        return brands
+        if self._brands_source is not raw:
+            self._brands = _parse_brands(raw)
+            self._brands_source = raw
+        return self._brands
 
     def _remove_box_recursive(self, box_type: str, box_list: list[Box]) -> bool:
         """Internal helper used by `remove_box_by_type`."""
@@ -124,11 +275,15 @@ class HEICFile:
 
     def remove_box_by_type(self, box_type: str) -> bool:
         """Remove the first box matching `box_type`, searching recursively."""
-        return self._remove_box_recursive(box_type, self.boxes)
+        removed = self._remove_box_recursive(box_type, self.boxes)
+        if removed:
+            self._index_boxes()
+        return removed
 
     def remove_item_by_id(self, item_id_to_remove: int):
         """Fully remove an item from iinf/iloc/ipma/iref and clean orphaned properties."""
-        print(f"Attempting to remove Item ID {item_id_to_remove} from all references (V16)...")
+        log.debug("Attempting to remove Item ID %s from all references (V16)...", item_id_to_remove)
+        self._invalidate_item_caches()
 
         # Update iinf metadata
         if self._iinf_box:
@@ -136,11 +291,12 @@ class HEICFile:
                 c for c in self._iinf_box.children 
                 if not (isinstance(c, ItemInfoEntryBox) and c.item_id == item_id_to_remove)
             ]
+            self._iinf_box.mark_dirty()
             self._iinf_box.entries = [
                 e for e in self._iinf_box.entries 
                 if e.item_id != item_id_to_remove
             ]
-            print(f"  - Removed from 'iinf' box.")
+            log.debug("Removed from 'iinf' box.")
 
         # Update iloc entries
         if self._iloc_box:
@@ -148,24 +304,26 @@ class HEICFile:
                 loc for loc in self._iloc_box.locations 
                 if loc.item_id != item_id_to_remove
             ]
-            print(f"  - Removed from 'iloc' box.")
+            self._iloc_box.mark_dirty()
+            log.debug("Removed from 'iloc' box.")
 
         # Update iref relationships
         if self._iref_box:
             for i in range(len(self._iref_box.children) - 1, -1, -1):
                 ref_box = self._iref_box.children[i]
                 from_id_size = 4 if self._iref_box.version == 1 else 2
-                if len(ref_box.raw_data) >= 4 + from_id_size:
-                    from_id = _read_int(ref_box.raw_data, 4, from_id_size)
+                if len(ref_box.raw_data) >= from_id_size:
+                    from_id = _read_int(ref_box.raw_data, 0, from_id_size)
                     if from_id == item_id_to_remove:
                         self._iref_box.children.pop(i)
-                        print(f"  - Removed 'iref' child box (type '{ref_box.type}') with from_id {from_id}.")
+                        self._iref_box.mark_dirty()
+                        log.debug("Removed 'iref' child box (type '%s') with from_id %s.", ref_box.type, from_id)
             
             ref_types_to_clean = list(self._iref_box.references.keys())
             for ref_type in ref_types_to_clean:
                 if item_id_to_remove in self._iref_box.references[ref_type]:
                     del self._iref_box.references[ref_type][item_id_to_remove]
-                    print(f"  - Removed from_id {item_id_to_remove} from 'iref.references[{ref_type}]'.")
+                    log.debug("Removed from_id %s from 'iref.references[%s]'.", item_id_to_remove, ref_type)
                 
                 from_ids_to_clean = list(self._iref_box.references[ref_type].keys())
                 for from_id in from_ids_to_clean:
@@ -173,7 +331,10 @@ class HEICFile:
                         to_id for to_id in self._iref_box.references[ref_type][from_id]
                         if to_id != item_id_to_remove
                     ]
-            print(f"  - Cleaned 'iref.references' of to_id {item_id_to_remove}.")
+            log.debug("Cleaned 'iref.references' of to_id %s.", item_id_to_remove)
+
+        # Drop the removed 'infe'/'iref' children from the fourcc index.
+        self._index_boxes()
 
         # Update property associations and definitions
         if self._iprp_box and self._iprp_box.ipma and self._iprp_box.ipco:
@@ -181,7 +342,7 @@ class HEICFile:
             ipco = self._iprp_box.ipco
             
             if item_id_to_remove not in ipma.entries:
-                print(f"  - Item {item_id_to_remove} not in 'ipma'. No properties to clean.")
+                log.debug("Item %s not in 'ipma'. No properties to clean.", item_id_to_remove)
                 return 
             
             # Identify property indices referenced exclusively by the removed item.
@@ -192,7 +353,8 @@ class HEICFile:
             
             # Remove the item entry itself.
             del ipma.entries[item_id_to_remove]
-            print(f"  - Removed Item {item_id_to_remove} from 'ipma'.")
+            ipma.mark_dirty()
+            log.debug("Removed Item %s from 'ipma'.", item_id_to_remove)
 
             # Determine which properties are now unused.
             all_remaining_props = set()
@@ -204,10 +366,10 @@ class HEICFile:
             orphaned_props = props_to_remove - all_remaining_props
             
             if not orphaned_props:
-                print(f"  - No orphaned properties found in 'ipco' to remove.")
+                log.debug("No orphaned properties found in 'ipco' to remove.")
                 return
 
-            print(f"  - Found orphaned properties to remove from 'ipco': {orphaned_props}")
+            log.debug("Found orphaned properties to remove from 'ipco': %s", orphaned_props)
             
             # Remove orphaned properties from `ipco`, iterating from the end to keep indices valid.
             orphaned_indices_0based = sorted([p - 1 for p in orphaned_props], reverse=True)
@@ -218,13 +380,15 @@ class HEICFile:
             for index_0 in orphaned_indices_0based:
                 if 0 <= index_0 < len(ipco.children):
                     removed_prop = ipco.children.pop(index_0)
-                    print(f"    - Removed property at index {index_0+1} ({removed_prop.type}) from 'ipco'.")
+                    ipco.mark_dirty()
+                    log.debug("Removed property at index %s (%s) from 'ipco'.", index_0+1, removed_prop.type)
                 else:
-                    print(f"    - Warning: Orphaned index {index_0+1} out of bounds for 'ipco'.")
+                    log.warning("Orphaned index %s out of bounds for 'ipco'.", index_0+1)
+            self._index_boxes()
 
             new_prop_count = len(ipco.children)
             if new_prop_count != original_prop_count:
-                print("  - Re-indexing 'ipma' associations...")
+                log.debug("Re-indexing 'ipma' associations...")
                 current_new_index = 1
                 current_old_index = 1
                 orphaned_props_1based = set(i + 1 for i in orphaned_indices_0based)
@@ -247,41 +411,42 @@ class HEICFile:
                     
                     # print(f"    - Item {item_id} associations: {entry.associations} -> {new_associations}")
                     entry.associations = new_associations
-                print("  - 'ipma' re-indexing complete.")
+                ipma.mark_dirty()
+                log.debug("'ipma' re-indexing complete.")
             else:
-                 print("  - No 'ipma' re-indexing needed.")
+                 log.debug("No 'ipma' re-indexing needed.")
     def set_content_identifier(self, new_content_id: str) -> bool:
         """Locate the primary `infe` entry and update its item name with a UUID."""
         primary_id = self.get_primary_item_id()
         if not primary_id:
-            print("Error: Cannot find primary item ID.")
+            log.error("Cannot find primary item ID.")
             return False
             
         if not self._iinf_box:
-            print("Error: Cannot find 'iinf' box shortcut (_iinf_box).")
+            log.error("Cannot find 'iinf' box shortcut (_iinf_box).")
             return False
             
-        print(f"Searching for 'infe' box with primary_id = {primary_id}")
+        log.debug("Searching for 'infe' box with primary_id = %s", primary_id)
         
         target_id = primary_id
         found_ids = [box.item_id for box in self._iinf_box.children if isinstance(box, ItemInfoEntryBox)]
         
         if primary_id not in found_ids:
-            print(f"Warning: Primary ID {primary_id} not found directly in 'infe' list.")
+            log.debug("Primary ID %s not found directly in 'infe' list.", primary_id)
             shifted_id = primary_id << 16
             if shifted_id in found_ids:
-                print(f"Info: Found vendor-specific shifted ID: {shifted_id} (for {primary_id})")
+                log.debug("Found vendor-specific shifted ID: %s (for %s)", shifted_id, primary_id)
                 target_id = shifted_id
             else:
-                print(f"Error: Could not find primary ID {primary_id} OR shifted ID {shifted_id}.")
-                print(f"Available 'infe' item IDs found were: {found_ids}")
+                log.error("Could not find primary ID %s OR shifted ID %s. Available 'infe' item IDs: %s",
+                          primary_id, shifted_id, found_ids)
                 return False
 
         # Update both the parsed box and the cached entry representation.
         for box in self._iinf_box.children:
             if isinstance(box, ItemInfoEntryBox):
                 if box.item_id == target_id:
-                    print(f"Success: Found 'infe' box for target ID {target_id}. Setting item_name...")
+                    log.debug("Found 'infe' box for target ID %s. Setting item_name...", target_id)
                     box.item_name = new_content_id
                     
                     for entry in self._iinf_box.entries:
@@ -290,7 +455,7 @@ class HEICFile:
                             break
                     return True
                     
-        print(f"Error: Logic failed to find 'infe' box for target ID {target_id} even after check.")
+        log.error("Logic failed to find 'infe' box for target ID %s even after check.", target_id)
         return False
 
     @staticmethod
@@ -313,14 +478,20 @@ class HEICFile:
                 return self._normalize_item_id(entry.item_id)
         return None
 
+    def _get_iloc_by_id(self) -> dict[int, ItemLocation]:
+        """Return an item ID -> `iloc` entry map, rebuilt when `locations` is replaced."""
+        if not self._iloc_box:
+            return {}
+        locations = self._iloc_box.locations
+        if self._iloc_by_id_source is not locations:
+            # Iterate in reverse so the first entry wins for duplicated IDs.
+            self._iloc_by_id = {loc.item_id: loc for loc in reversed(locations)}
+            self._iloc_by_id_source = locations
+        return self._iloc_by_id
+
     def _get_item_location(self, item_id: int) -> Optional[ItemLocation]:
         """Fetch the `iloc` entry describing where the item lives inside the file."""
-        if not self._iloc_box:
-            return None
-        for loc in self._iloc_box.locations:
-            if loc.item_id == item_id:
-                return loc
-        return None
+        return self._get_iloc_by_id().get(item_id)
 
     def _read_item_bytes(self, item_id: int) -> bytes:
         """
@@ -384,9 +555,11 @@ class HEICFile:
         updated_payload[relative_start:relative_end] = new_payload
         mdat_box.raw_data = bytes(updated_payload)
         mdat_box.size = 8 + len(mdat_box.raw_data)
+        mdat_box.mark_dirty()
 
         loc.extents = [(offset, len(new_payload))]
         loc.raw_extents = [(offset - base_offset, len(new_payload))]
+        self._iloc_box.mark_dirty()
 
         if delta == 0:
             return
@@ -465,15 +638,24 @@ class HEICFile:
         self._write_item_bytes(exif_item_id, new_exif_bytes)
 
     def reconstruct_primary_image(self) -> Image.Image | None:
-        """Reconstruct the primary image using pillow-heif (handles grid tiles)."""
+        """
+        Reconstruct the primary image using pillow-heif (handles grid tiles).
+
+        Decodes from the already-loaded file buffer and caches the result, so
+        repeated calls do not re-read or re-decode the file.
+        """
+        if self._primary_image is not None:
+            return self._primary_image
         try:
-            print("Reconstructing primary image using pillow-heif...")
-            image = Image.open(self.filepath)
+            log.debug("Reconstructing primary image using pillow-heif...")
+            source = BytesIO(self._data) if self._data is not None else self.filepath
+            image = Image.open(source)
             image.load() 
-            print("Successfully reconstructed image.")
+            log.debug("Successfully reconstructed image.")
+            self._primary_image = image
             return image
         except Exception as e:
-            print(f"Failed to reconstruct image with pillow-heif: {e}")
+            log.error("Failed to reconstruct image with pillow-heif: %s", e)
             return None
 
     def get_primary_image_grid(self) -> Grid | None:
@@ -496,6 +678,11 @@ class HEICFile:
     def get_grid_layout(self) -> list[int] | None:
         primary_id = self.get_primary_item_id()
         if not primary_id: return None
+        if primary_id not in self._grid_layout_cache:
+            self._grid_layout_cache[primary_id] = self._find_grid_layout(primary_id)
+        return self._grid_layout_cache[primary_id]
+
+    def _find_grid_layout(self, primary_id: int) -> list[int] | None:
         if not self._iref_box: return None
         
         if 'dimg' in self._iref_box.references and primary_id in self._iref_box.references['dimg']:
@@ -504,12 +691,17 @@ class HEICFile:
         # Fall back to Samsung-style shifted IDs.
         shifted_id = primary_id << 16
         if 'dimg' in self._iref_box.references and shifted_id in self._iref_box.references['dimg']:
-             print("Info: Using shifted primary ID to find grid layout.")
+             log.debug("Using shifted primary ID to find grid layout.")
              return self._iref_box.references['dimg'].get(shifted_id)
              
         return None
 
     def get_image_size(self, item_id: int) -> tuple[int, int] | None:
+        if item_id not in self._image_size_cache:
+            self._image_size_cache[item_id] = self._find_image_size(item_id)
+        return self._image_size_cache[item_id]
+
+    def _find_image_size(self, item_id: int) -> tuple[int, int] | None:
         if not (self._iprp_box and self._iprp_box.ipma and self._iprp_box.ipco): return None
         
         target_id = item_id
@@ -524,18 +716,30 @@ class HEICFile:
                  else:
                     return None
         
+        if self._ispe_by_index is None:
+            # 0-based ipco index -> 'ispe' property, built once per ipco layout.
+            self._ispe_by_index = {
+                index: prop
+                for index, prop in enumerate(self._iprp_box.ipco.children)
+                if isinstance(prop, ImageSpatialExtentsBox)
+            }
+
         item_associations = self._iprp_box.ipma.entries[target_id].associations
         for assoc in item_associations:
-            property_index = assoc.property_index - 1
-            if 0 <= property_index < len(self._iprp_box.ipco.children):
-                prop = self._iprp_box.ipco.children[property_index]
-                if isinstance(prop, ImageSpatialExtentsBox):
-                    return (prop.image_width, prop.image_height)
+            prop = self._ispe_by_index.get(assoc.property_index - 1)
+            if prop is not None:
+                return (prop.image_width, prop.image_height)
         return None
 
+    def _invalidate_item_caches(self) -> None:
+        """Forget derived per-item lookups after item metadata is edited."""
+        self._image_size_cache.clear()
+        self._grid_layout_cache.clear()
+        self._ispe_by_index = None
+
     def get_primary_item_id(self) -> int | None:
         if not self._pitm_box: 
-            print("Warning: 'pitm' box not found.")
+            log.warning("'pitm' box not found.")
             return None
         return self._pitm_box.item_id
 
@@ -545,92 +749,89 @@ class HEICFile:
         for entry in self._iinf_box.entries: print(f"  - {entry}")
 
     def _detect_vendor(self):
+        """Resolve the vendor handler once; an assigned handler is kept."""
+        if self.handler is not None:
+            return
         self.handler = resolve_handler(self)
 
     def get_item_data(self, item_id: int) -> bytes | None:
         if not self._iloc_box:
-            print("Error: 'iloc' box not found.")
+            log.error("'iloc' box not found.")
             return None
             
+        iloc_by_id = self._get_iloc_by_id()
         target_id = item_id
-        location = next((loc for loc in self._iloc_box.locations if loc.item_id == target_id), None)
+        location = iloc_by_id.get(target_id)
         
         if not location:
             shifted_id = item_id << 16
-            location = next((loc for loc in self._iloc_box.locations if loc.item_id == shifted_id), None)
+            location = iloc_by_id.get(shifted_id)
             if location:
-                print(f"Info: Located item {item_id} using shifted ID {shifted_id} in 'iloc'.")
+                log.debug("Located item %s using shifted ID %s in 'iloc'.", item_id, shifted_id)
                 target_id = shifted_id
         
         if not location and (item_id & 0xFFFF0000):
             unshifted_id = item_id & 0x0000FFFF
-            location = next((loc for loc in self._iloc_box.locations if loc.item_id == unshifted_id), None)
+            location = iloc_by_id.get(unshifted_id)
             if location:
-                 print(f"Info: Located item {item_id} using un-shifted ID {unshifted_id} in 'iloc'.")
+                 log.debug("Located item %s using un-shifted ID %s in 'iloc'.", item_id, unshifted_id)
                  target_id = unshifted_id
 
         if not location:
-            print(f"Error: Item with ID {item_id} (or variants) not found in 'iloc' box.")
+            log.error("Item with ID %s (or variants) not found in 'iloc' box.", item_id)
             return None
 
         if not location.extents:
-             print(f"Warning: Item with ID {target_id} has no extents.")
+             log.warning("Item with ID %s has no extents.", target_id)
              return b''
 
-        data_chunks = []
-        with open(self.filepath, 'rb') as f:
-            for offset, length in location.extents:
-                f.seek(offset)
-                data_chunks.append(f.read(length))
-        return b''.join(data_chunks)
+        return self._read_extents(location.extents)
 
     def get_motion_photo_data(self) -> bytes | None:
-        if not self.handler:
-            self._detect_vendor()
         data = self.handler.extract_motion_video(self)
         if data is not None:
-            print("Found motion photo data via vendor handler.")
+            log.debug("Found motion photo data via vendor handler.")
         return data
 
     def get_thumbnail_data(self) -> bytes | None:
-        print("Attempting to extract thumbnail data...")
+        log.debug("Attempting to extract thumbnail data...")
         primary_id = self.get_primary_item_id()
         if not primary_id:
-            print("Error: Could not determine primary item ID.")
+            log.error("Could not determine primary item ID.")
             return None
         
         if not self._iref_box:
-            print("Info: No 'iref' box found, cannot search for thumbnail.")
+            log.debug("No 'iref' box found, cannot search for thumbnail.")
             return None
 
         if 'thmb' not in self._iref_box.references:
-            print("Info: No 'thmb' references found in 'iref' box.")
+            log.debug("No 'thmb' references found in 'iref' box.")
             return None
         
         target_id = primary_id
         if primary_id not in self._iref_box.references['thmb']:
             shifted_primary_id = primary_id << 16
             if shifted_primary_id not in self._iref_box.references['thmb']:
-                print(f"Info: Primary item ID {primary_id} (or shifted) has no 'thmb' reference.")
+                log.debug("Primary item ID %s (or shifted) has no 'thmb' reference.", primary_id)
                 return None
             
-            print("Info: Using shifted primary ID to find thumbnail.")
+            log.debug("Using shifted primary ID to find thumbnail.")
             target_id = shifted_primary_id
 
 
         thumbnail_ids = self._iref_box.references['thmb'][target_id]
         if not thumbnail_ids:
-            print(f"Info: Primary item ID {target_id} has 'thmb' reference, but no target IDs.")
+            log.debug("Primary item ID %s has 'thmb' reference, but no target IDs.", target_id)
             return None
 
         thumbnail_id = thumbnail_ids[0]
-        print(f"Found thumbnail reference: Primary ID {target_id} -> Thumbnail ID {thumbnail_id}")
+        log.debug("Found thumbnail reference: Primary ID %s -> Thumbnail ID %s", target_id, thumbnail_id)
         
         thumbnail_data = self.get_item_data(thumbnail_id)
         
         if thumbnail_data:
-            print(f"Successfully extracted thumbnail data (Item ID {thumbnail_id}).")
+            log.debug("Successfully extracted thumbnail data (Item ID %s).", thumbnail_id)
             return thumbnail_data
         else:
-            print(f"Error: Failed to get data for thumbnail item ID {thumbnail_id}.")
+            log.error("Failed to get data for thumbnail item ID %s.", thumbnail_id)
             return None
@@ -1,186 +1,177 @@
+import logging
 import struct
-from .base import Box, FullBox
+from .base import Box, BytesLike, FullBox, _U16, _U32, _serialised_field
+from ._parsers import (
+    ItemLocation,
+    ItemPropertyAssociation,
+    ItemPropertyAssociationEntry,
+    _decode_fourcc,
+    _make_offset_remapper,
+    _make_writer,
+    _read_cstring,
+    _record_array_codec,
+    parse_iloc,
+    parse_ipma,
+    parse_iref_child,
+)
 from io import BytesIO
-from typing import List, Optional
-
-# Helper functions ---------------------------------------------------------
-
-def _read_int(data: bytes, pos: int, size: int) -> int:
-    """Helper to read an integer of variable size."""
-    if pos + size > len(data): return 0
-    if size == 0: return 0
-    if size == 1: return data[pos]
-    if size == 2: return struct.unpack('>H', data[pos:pos+2])[0]
-    if size == 4: return struct.unpack('>I', data[pos:pos+4])[0]
-    if size == 8: return struct.unpack('>Q', data[pos:pos+8])[0]
-    return 0
-
-def _write_int(value: int, size: int) -> bytes:
-    """Helper to write an integer of variable size."""
-    if size == 0: return b''
-    if size == 1: return struct.pack('>B', value)
-    if size == 2: return struct.pack('>H', value)
-    if size == 4: return struct.pack('>I', value)
-    if size == 8: return struct.pack('>Q', value)
-    return b''
-
-# ItemLocation -------------------------------------------------------------
-class ItemLocation:
-    """Represents a single `iloc` entry with all associated extents."""
-
-    def __init__(self, item_id):
-        self.item_id = item_id
-        self.data_reference_index = 0
-        self.base_offset = 0
-        self.construction_method = 0
-        self.extent_indices = []
-        # Stored as (relative_offset, length)
-        self.raw_extents = []
-        # Stored as (absolute_offset, length)
-        self.extents = []
+from typing import Iterator, List, Optional
 
-    def __repr__(self):
-        total_length = sum(ext[1] for ext in self.extents)
-        return f"<ItemLocation ID={self.item_id} extents={len(self.extents)} total_size={total_length}>"
+log = logging.getLogger(__name__)
 
 # ItemLocationBox (`iloc`) -------------------------------------------------
 class ItemLocationBox(FullBox):
-    def __init__(self, size: int, box_type: str, offset: int, raw_data: bytes):
+    __slots__ = (
+        'locations', '_offset_size', '_length_size', '_base_offset_size', '_index_size',
+        'item_count', '_encoded_raw', '_item_ids',
+    )
+
+    offset_size = _serialised_field('_offset_size')
+    length_size = _serialised_field('_length_size')
+    base_offset_size = _serialised_field('_base_offset_size')
+    index_size = _serialised_field('_index_size')
+
+    def __init__(self, size: int, box_type: str, offset: int, raw_data: BytesLike):
         self.locations: List[ItemLocation] = []
-        self.offset_size = 0
-        self.length_size = 0
-        self.base_offset_size = 0
-        self.index_size = 0
+        self._offset_size = 0
+        self._length_size = 0
+        self._base_offset_size = 0
+        self._index_size = 0
         self.item_count = 0
+        # The `raw_data` object `locations` were read from or last written to;
+        # cleared by `mark_dirty()`, so a no-op rebuild can keep `raw_data` as is.
+        self._encoded_raw: Optional[BytesLike] = None
+        # (locations list, frozenset of its item IDs); see `item_ids`.
+        self._item_ids: Optional[tuple] = None
         super().__init__(size, box_type, offset, raw_data)
         
     def _post_parse_initialization(self):
         self._parse_locations()
+
+    @property
+    def item_ids(self) -> frozenset:
+        """IDs of every `iloc` entry, recomputed when `locations` is replaced."""
+        cached = self._item_ids
+        if cached is None or cached[0] is not self.locations:
+            cached = self._item_ids = (self.locations, frozenset(loc.item_id for loc in self.locations))
+        return cached[1]
         
     def _parse_locations(self):
-        stream = self.raw_data[4:] 
-        
-        sizes = struct.unpack('>H', stream[0:2])[0]
-        self.offset_size = (sizes >> 12) & 0x0F
-        self.length_size = (sizes >> 8) & 0x0F
-        self.base_offset_size = (sizes >> 4) & 0x0F
-        
-        if self.version == 1 or self.version == 2:
-            self.index_size = sizes & 0x0F
-        
-        current_pos = 2 
-        if self.version < 2:
-            self.item_count = struct.unpack('>H', stream[2:4])[0]
-            current_pos = 4
-        else: 
-            self.item_count = struct.unpack('>I', stream[2:6])[0]
-            current_pos = 6
-
-        for _ in range(self.item_count):
-            item_id = 0
-            item_id_size = 2 if self.version < 2 else 4
-            if current_pos + item_id_size > len(stream): break
-            item_id = _read_int(stream, current_pos, item_id_size)
-            current_pos += item_id_size
-            
-            loc = ItemLocation(item_id)
-
-            if (self.version == 1 or self.version == 2) and current_pos + 2 <= len(stream):
-                loc.construction_method = struct.unpack('>H', stream[current_pos:current_pos+2])[0]
-                current_pos += 2 
-
-            if current_pos + 2 > len(stream): break 
-            loc.data_reference_index = struct.unpack('>H', stream[current_pos:current_pos+2])[0]
-            current_pos += 2 
-            
-            base_offset = 0
-            if self.base_offset_size > 0:
-                if current_pos + self.base_offset_size > len(stream): break
-                base_offset = _read_int(stream, current_pos, self.base_offset_size)
-                current_pos += self.base_offset_size
-            loc.base_offset = base_offset
-
-            if current_pos + 2 > len(stream): break
-            extent_count = struct.unpack('>H', stream[current_pos : current_pos+2])[0]
-            current_pos += 2
-            
-            for __ in range(extent_count):
-                if (self.version == 1 or self.version == 2) and self.index_size > 0:
-                     if current_pos + self.index_size > len(stream): break
-                     loc.extent_indices.append(_read_int(stream, current_pos, self.index_size))
-                     current_pos += self.index_size 
-
-                if current_pos + self.offset_size > len(stream): break
-                extent_offset = _read_int(stream, current_pos, self.offset_size)
-                current_pos += self.offset_size
-
-                if current_pos + self.length_size > len(stream): break
-                extent_length = _read_int(stream, current_pos, self.length_size)
-                current_pos += self.length_size
-                
-                loc.raw_extents.append((extent_offset, extent_length))
-                loc.extents.append((base_offset + extent_offset, extent_length))
-            self.locations.append(loc)
+        table = parse_iloc(self.data_view[4:], self.version)
+        self._offset_size = table.offset_size
+        self._length_size = table.length_size
+        self._base_offset_size = table.base_offset_size
+        self._index_size = table.index_size
+        self.item_count = table.item_count
+        self.locations = table.locations
+        if len(self.locations) == self.item_count:
+            # Truncated tables are left for the next rebuild to rewrite.
+            self._encoded_raw = self.raw_data
+
+    def mark_dirty(self):
+        """Also record that `raw_data` no longer matches `locations`."""
+        self._encoded_raw = None
+        super().mark_dirty()
+
+    def _content_size(self) -> int:
+        """Payload size `rebuild_iloc_content` writes; it depends only on field widths and counts."""
+        has_construction_method = self.version == 1 or self.version == 2
+        use_index = has_construction_method and self.index_size > 0
+        id_and_count_size = 2 if self.version < 2 else 4
+        item_header_size = id_and_count_size + (2 if has_construction_method else 0) + 2 + self.base_offset_size + 2
+        extent_record_size = (self.index_size if use_index else 0) + self.offset_size + self.length_size
+        extent_count = sum(len(loc.raw_extents or loc.extents) for loc in self.locations)
+        return (4 + 2 + id_and_count_size
+                + len(self.locations) * item_header_size
+                + extent_count * extent_record_size)
+
+    def predict_size(self) -> int:
+        """
+        Size of the whole box after the next `rebuild_iloc_content`, computed
+        without serialising. Offset deltas never change it: field widths are kept.
+        """
+        content_size = self._content_size()
+        return len(self.build_header(content_size)) + content_size
 
     def rebuild_iloc_content(self, mdat_offset_delta: int, original_mdat_offset: int, original_mdat_size: int,
                                    meta_offset_delta: int, original_meta_offset: int, original_meta_size: int):
         """Rebuild the `iloc` payload after `mdat` or `meta` offsets change."""
-        print(f"Applying mdat delta ({mdat_offset_delta}) and meta delta ({meta_offset_delta}) to 'iloc' box...")
-        content_stream = BytesIO()
-        
-        content_stream.write(self.build_full_box_header())
+        log.debug("Applying mdat delta (%s) and meta delta (%s) to 'iloc' box...", mdat_offset_delta, meta_offset_delta)
+        if mdat_offset_delta == 0 and meta_offset_delta == 0 and self._encoded_raw is self.raw_data:
+            # Nothing moved and no entry was edited: `raw_data` is already current.
+            log.debug("'iloc' box content unchanged.")
+            return
+
+        has_construction_method = self.version == 1 or self.version == 2
+        use_index = has_construction_method and self.index_size > 0
+        item_id_size = 2 if self.version < 2 else 4
+        item_count_size = 2 if self.version < 2 else 4
+        write_item_id = _make_writer(item_id_size)
+        write_item_count = _make_writer(item_count_size)
+        write_base_offset = _make_writer(self.base_offset_size)
+        write_index = _make_writer(self.index_size if use_index else 0)
+        write_offset = _make_writer(self.offset_size)
+        write_length = _make_writer(self.length_size)
+
+        pending = []
+        for loc in self.locations:
+            extents_to_process = loc.raw_extents if loc.raw_extents else [
+                (max(absolute_offset - loc.base_offset, 0), length) 
+                for absolute_offset, length in loc.extents
+            ]
+            pending.append((loc, extents_to_process))
+
+        # Zero-filled: fields that are 0 (the common case for construction_method,
+        # data_reference_index and extent_index) are skipped instead of written.
+        # The output size is known up front.
+        content = bytearray(self._content_size())
+        content[0:4] = self.build_full_box_header()
         
         sizes = (self.offset_size << 12) | (self.length_size << 8) | (self.base_offset_size << 4)
-        if self.version == 1 or self.version == 2:
+        if has_construction_method:
             sizes |= self.index_size
-        content_stream.write(struct.pack('>H', sizes))
-
-        if self.version < 2:
-            content_stream.write(struct.pack('>H', len(self.locations)))
-        else:
-            content_stream.write(struct.pack('>I', len(self.locations)))
-
-        original_mdat_end_offset = original_mdat_offset + original_mdat_size
-        original_meta_end_offset = original_meta_offset + original_meta_size
-
-        def _adjust_absolute_offset(original_offset: int) -> int:
-            if original_offset == 0:
-                return 0
-            if original_mdat_offset <= original_offset < original_mdat_end_offset:
-                return original_offset + mdat_offset_delta
-            if original_meta_offset <= original_offset < original_meta_end_offset:
-                return original_offset + meta_offset_delta
-            return original_offset
-
-        for loc in self.locations:
-            item_id_size = 2 if self.version < 2 else 4
-            content_stream.write(_write_int(loc.item_id, item_id_size))
+        _U16.pack_into(content, 4, sizes)
+        write_item_count(content, 6, len(self.locations))
+        pos = 6 + item_count_size
+
+        _adjust_absolute_offset = _make_offset_remapper([
+            (original_mdat_offset, original_mdat_size, mdat_offset_delta),
+            (original_meta_offset, original_meta_size, meta_offset_delta),
+        ])
+
+        for loc, extents_to_process in pending:
+            write_item_id(content, pos, loc.item_id)
+            pos += item_id_size
             
-            if (self.version == 1 or self.version == 2):
-                content_stream.write(struct.pack('>H', loc.construction_method & 0xFFFF))
+            if has_construction_method:
+                if loc.construction_method:
+                    _U16.pack_into(content, pos, loc.construction_method & 0xFFFF)
+                pos += 2
             
-            content_stream.write(struct.pack('>H', loc.data_reference_index))
+            if loc.data_reference_index:
+                _U16.pack_into(content, pos, loc.data_reference_index)
+            pos += 2
             
             if self.base_offset_size > 0:
                 new_base_offset = _adjust_absolute_offset(loc.base_offset)
-                content_stream.write(_write_int(new_base_offset, self.base_offset_size))
+                write_base_offset(content, pos, new_base_offset)
+                pos += self.base_offset_size
             else:
                 new_base_offset = 0
             
-            extents_to_process = loc.raw_extents if loc.raw_extents else [
-                (max(absolute_offset - loc.base_offset, 0), length) 
-                for absolute_offset, length in loc.extents
-            ]
-            content_stream.write(struct.pack('>H', len(extents_to_process)))
+            _U16.pack_into(content, pos, len(extents_to_process))
+            pos += 2
 
             new_extents_absolute = []
             new_extents_relative = []
             new_extent_indices = []
 
             for idx, (original_relative_offset, length) in enumerate(extents_to_process):
-                if (self.version == 1 or self.version == 2) and self.index_size > 0:
+                if use_index:
                     extent_index = loc.extent_indices[idx] if idx < len(loc.extent_indices) else 0
-                    content_stream.write(_write_int(extent_index, self.index_size))
+                    if extent_index:
+                        write_index(content, pos, extent_index)
+                    pos += self.index_size
                     new_extent_indices.append(extent_index)
                 
                 original_absolute_offset = loc.base_offset + original_relative_offset
@@ -191,7 +182,7 @@ class ItemLocationBox(FullBox):
 
                 # Guard against negative offsets produced by delta adjustments.
                 if new_absolute_offset < 0:
-                    print(f"  Warning: Calculated a negative offset ({new_absolute_offset}) for item {loc.item_id}. Setting to 0.")
+                    log.warning("Calculated a negative offset (%s) for item %s. Setting to 0.", new_absolute_offset, loc.item_id)
                     new_absolute_offset = 0
 
                 if self.base_offset_size > 0:
@@ -200,12 +191,14 @@ class ItemLocationBox(FullBox):
                     new_relative_offset = new_absolute_offset
 
                 if new_relative_offset < 0:
-                    print(f"  Warning: Calculated a negative relative offset ({new_relative_offset}) for item {loc.item_id}. Setting to 0.")
+                    log.warning("Calculated a negative relative offset (%s) for item %s. Setting to 0.", new_relative_offset, loc.item_id)
                     new_relative_offset = 0
                     new_absolute_offset = new_base_offset
                 
-                content_stream.write(_write_int(new_relative_offset, self.offset_size))
-                content_stream.write(_write_int(length, self.length_size))
+                write_offset(content, pos, new_relative_offset)
+                pos += self.offset_size
+                write_length(content, pos, length)
+                pos += self.length_size
                 
                 new_extents_absolute.append((new_absolute_offset, length))
                 new_extents_relative.append((new_relative_offset, length))
@@ -216,143 +209,184 @@ class ItemLocationBox(FullBox):
             if new_extent_indices:
                 loc.extent_indices = new_extent_indices
 
-        self.raw_data = content_stream.getvalue()
-        print(" 'iloc' box content successfully rebuilt.")
+        self.raw_data = bytes(content)
+        self.mark_dirty()
+        self._encoded_raw = self.raw_data
+        log.debug("'iloc' box content successfully rebuilt.")
 
     def build_content(self) -> bytes:
         return self.raw_data
 
 # ItemInfoEntry ------------------------------------------------------------
 class ItemInfoEntry:
-    def __init__(self, item_id, item_type, item_name):
+    __slots__ = ('item_id', 'type', '_name', '_source')
+
+    def __init__(self, item_id, item_type, item_name=None, source=None):
         self.item_id = item_id
         self.type = item_type # 4-char code like 'hvc1'
-        self.name = item_name # UTF-8 string
+        # UTF-8 string; when omitted it is read from `source` (an infe box) on first use.
+        self._name = item_name
+        self._source = source
+
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            self._name = self._source.item_name if self._source is not None else ""
+        return self._name
+
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+
     def __repr__(self):
         return f"<ItemInfoEntry ID={self.item_id} type='{self.type}' name='{self.name}'>"
 
 # ItemInfoEntryBox (`infe`) -----------------------------------------------
 class ItemInfoEntryBox(FullBox):
-    """Parse and emit `infe` (ItemInfoEntryBox) structures."""
-    def __init__(self, size: int, box_type: str, offset: int, raw_data: bytes):
-        self.item_id: int = 0
-        self.item_protection_index: int = 0
-        self.item_type: str = "" # 4-char code
-        self.item_name: str = "" # UTF-8 string
-        self.content_type: Optional[str] = None
-        self.content_encoding: Optional[str] = None
+    """
+    Parse and emit `infe` (ItemInfoEntryBox) structures.
+
+    Only the fixed fields are decoded while parsing. The trailing strings
+    (`item_name`, `content_type`, `content_encoding`) stay as a view of the
+    payload until one of them is first read or assigned.
+    """
+
+    __slots__ = (
+        '_item_id', '_item_protection_index', '_item_type', '_item_name',
+        '_content_type', '_content_encoding', '_has_protection_field', '_strings',
+    )
+
+    item_id = _serialised_field('_item_id')
+    item_protection_index = _serialised_field('_item_protection_index')
+    item_type = _serialised_field('_item_type')  # 4-char code
+
+    def __init__(self, size: int, box_type: str, offset: int, raw_data: BytesLike):
+        self._strings: Optional[memoryview] = None
+        self._item_id: int = 0
+        self._item_protection_index: int = 0
+        self._item_type: str = ""
+        self._item_name: str = "" # UTF-8 string
+        self._content_type: Optional[str] = None
+        self._content_encoding: Optional[str] = None
         self._has_protection_field: bool = True
         super().__init__(size, box_type, offset, raw_data)
 
+    def _decode_strings(self):
+        strings = bytes(self._strings)
+        item_name, pos = _read_cstring(strings, 0)
+        content_type = content_encoding = None
+        if pos < len(strings):
+            content_type, pos = _read_cstring(strings, pos)
+        if pos < len(strings):
+            content_encoding, pos = _read_cstring(strings, pos)
+        self._strings = None
+        self._item_name = item_name
+        self._content_type = content_type
+        self._content_encoding = content_encoding
+
+    @property
+    def item_name(self) -> str:
+        if self._strings is not None: self._decode_strings()
+        return self._item_name
+
+    @item_name.setter
+    def item_name(self, value: str):
+        if self._strings is not None: self._decode_strings()
+        self._item_name = value
+        self.mark_dirty()
+
+    @property
+    def content_type(self) -> Optional[str]:
+        if self._strings is not None: self._decode_strings()
+        return self._content_type
+
+    @content_type.setter
+    def content_type(self, value: Optional[str]):
+        if self._strings is not None: self._decode_strings()
+        self._content_type = value
+        self.mark_dirty()
+
+    @property
+    def content_encoding(self) -> Optional[str]:
+        if self._strings is not None: self._decode_strings()
+        return self._content_encoding
+
+    @content_encoding.setter
+    def content_encoding(self, value: Optional[str]):
+        if self._strings is not None: self._decode_strings()
+        self._content_encoding = value
+        self.mark_dirty()
+
     def _post_parse_initialization(self):
-        stream = self.raw_data[4:]
+        # Fixed fields decode straight from the view; the strings wait for first use.
+        stream = self.data_view[4:]
         if not stream: return 
         
         pos = 0
         try:
             if self.version == 0 or self.version == 1:
-                self.item_id = struct.unpack('>H', stream[pos:pos+2])[0]
+                self._item_id = _U16.unpack_from(stream, pos)[0]
                 pos += 2
-                self.item_protection_index = struct.unpack('>H', stream[pos:pos+2])[0]
+                self._item_protection_index = _U16.unpack_from(stream, pos)[0]
                 pos += 2
-                self.item_type = ""
-                name_end = stream.find(b'\x00', pos)
-                if name_end == -1: name_end = len(stream)
-                self.item_name = stream[pos:name_end].decode('utf-8', errors='ignore')
-                pos = min(name_end + 1, len(stream))
-
-                if pos < len(stream):
-                    ctype_end = stream.find(b'\x00', pos)
-                    if ctype_end == -1: ctype_end = len(stream)
-                    self.content_type = stream[pos:ctype_end].decode('utf-8', errors='ignore')
-                    pos = min(ctype_end + 1, len(stream))
-
-                if pos < len(stream):
-                    cenc_end = stream.find(b'\x00', pos)
-                    if cenc_end == -1: cenc_end = len(stream)
-                    self.content_encoding = stream[pos:cenc_end].decode('utf-8', errors='ignore')
-                    pos = min(cenc_end + 1, len(stream))
+                self._item_type = ""
                 
             elif self.version == 2:
-                self.item_id = struct.unpack('>I', stream[pos:pos+4])[0]
+                self._item_id = _U32.unpack_from(stream, pos)[0]
                 pos += 4
 
                 remaining = len(stream) - pos
                 self._has_protection_field = False
                 if remaining >= 6:
-                    candidate_protection = struct.unpack('>H', stream[pos:pos+2])[0]
-                    candidate_type = stream[pos+2:pos+6]
+                    candidate_protection = _U16.unpack_from(stream, pos)[0]
+                    candidate_type = bytes(stream[pos+2:pos+6])
 
                     if candidate_protection <= 0x00FF and b'\x00' not in candidate_type:
                         # Standard ordering: 2-byte protection index followed by the 4CC.
-                        self.item_protection_index = candidate_protection
+                        self._item_protection_index = candidate_protection
                         self._has_protection_field = True
                         pos += 2
                         type_bytes = candidate_type
                         pos += 4
                     else:
                         # Samsung files often omit the protection index and write only the 4CC.
-                        self.item_protection_index = 0
+                        self._item_protection_index = 0
                         self._has_protection_field = False
-                        type_bytes = stream[pos:pos+4]
+                        type_bytes = bytes(stream[pos:pos+4])
                         pos += 4
                 elif remaining >= 4:
                     # Some vendor variants omit the 2-byte protection field entirely.
-                    self.item_protection_index = 0
+                    self._item_protection_index = 0
                     self._has_protection_field = False
-                    type_bytes = stream[pos:pos+4]
+                    type_bytes = bytes(stream[pos:pos+4])
                     pos += 4
                 else:
                     # Truncated data: fall back to an empty type.
                     type_bytes = b''
 
-                self.item_type = type_bytes.decode('ascii', errors='ignore').strip('\x00')
-
-                name_end = stream.find(b'\x00', pos)
-                if name_end == -1: name_end = len(stream)
-                self.item_name = stream[pos:name_end].decode('utf-8', errors='ignore')
-                pos = min(name_end + 1, len(stream))
-
-                if pos < len(stream):
-                    ctype_end = stream.find(b'\x00', pos)
-                    if ctype_end == -1: ctype_end = len(stream)
-                    self.content_type = stream[pos:ctype_end].decode('utf-8', errors='ignore')
-                    pos = min(ctype_end + 1, len(stream))
-
-                if pos < len(stream):
-                    cenc_end = stream.find(b'\x00', pos)
-                    if cenc_end == -1: cenc_end = len(stream)
-                    self.content_encoding = stream[pos:cenc_end].decode('utf-8', errors='ignore')
-                    pos = min(cenc_end + 1, len(stream))
+                try:
+                    self._item_type = _decode_fourcc(type_bytes)
+                except UnicodeDecodeError:
+                    self._item_type = type_bytes.strip(b'\x00').decode('ascii', errors='ignore')
 
             elif self.version == 3:
-                self.item_id = struct.unpack('>H', stream[pos:pos+2])[0]
+                self._item_id = _U16.unpack_from(stream, pos)[0]
                 pos += 2
-                self.item_protection_index = struct.unpack('>H', stream[pos:pos+2])[0]
+                self._item_protection_index = _U16.unpack_from(stream, pos)[0]
                 pos += 2
-                self.item_type = stream[pos:pos+4].decode('ascii').strip('\x00')
+                self._item_type = _decode_fourcc(bytes(stream[pos:pos+4]))
                 pos += 4
-                name_end = stream.find(b'\x00', pos)
-                if name_end == -1: name_end = len(stream)
-                self.item_name = stream[pos:name_end].decode('utf-8', errors='ignore')
-                pos = min(name_end + 1, len(stream))
-
-                if pos < len(stream):
-                    ctype_end = stream.find(b'\x00', pos)
-                    if ctype_end == -1: ctype_end = len(stream)
-                    self.content_type = stream[pos:ctype_end].decode('utf-8', errors='ignore')
-                    pos = min(ctype_end + 1, len(stream))
-
-                if pos < len(stream):
-                    cenc_end = stream.find(b'\x00', pos)
-                    if cenc_end == -1: cenc_end = len(stream)
-                    self.content_encoding = stream[pos:cenc_end].decode('utf-8', errors='ignore')
-                    pos = min(cenc_end + 1, len(stream))
+
+            else:
+                return
+
+            # Every version ends with the same NUL-terminated UTF-8 strings.
+            self._strings = stream[pos:]
                 
-        except (struct.error, IndexError) as e:
-            print(f"Warning: Failed to parse 'infe' box (v{self.version}). Content may be truncated. Error: {e}")
-            self.item_id = 0
-            self.item_type = ""
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            log.warning("Failed to parse 'infe' box (v%s). Content may be truncated. Error: %s", self.version, e)
+            self._item_id = 0
+            self._item_type = ""
             self.item_name = ""
 
     def build_content(self) -> bytes:
@@ -362,14 +396,14 @@ class ItemInfoEntryBox(FullBox):
         item_name_bytes_to_write = self.item_name.encode('utf-8') + b'\x00'
         
         if self.version == 0 or self.version == 1:
-            content.write(struct.pack('>H', self.item_id))
-            content.write(struct.pack('>H', self.item_protection_index))
+            content.write(_U16.pack(self.item_id))
+            content.write(_U16.pack(self.item_protection_index))
             content.write(item_name_bytes_to_write)
 
         elif self.version == 2:
-            content.write(struct.pack('>I', self.item_id))
+            content.write(_U32.pack(self.item_id))
             if self._has_protection_field:
-                content.write(struct.pack('>H', self.item_protection_index))
+                content.write(_U16.pack(self.item_protection_index))
             # Item types must be a 4CC; pad with NUL bytes when necessary.
             content.write(self.item_type.encode('ascii', errors='ignore')[:4].ljust(4, b'\x00'))
             content.write(item_name_bytes_to_write)
@@ -379,8 +413,8 @@ class ItemInfoEntryBox(FullBox):
                 content.write(self.content_encoding.encode('utf-8') + b'\x00')
 
         elif self.version == 3:
-            content.write(struct.pack('>H', self.item_id))
-            content.write(struct.pack('>H', self.item_protection_index))
+            content.write(_U16.pack(self.item_id))
+            content.write(_U16.pack(self.item_protection_index))
             content.write(self.item_type.encode('ascii').ljust(4, b'\x00'))
             content.write(item_name_bytes_to_write)
             if self.content_type is not None:
@@ -392,7 +426,9 @@ class ItemInfoEntryBox(FullBox):
 
 # ItemInfoBox (`iinf`) -----------------------------------------------------
 class ItemInfoBox(FullBox):
-    def __init__(self, size: int, box_type: str, offset: int, raw_data: bytes):
+    __slots__ = ('entries', 'item_count')
+
+    def __init__(self, size: int, box_type: str, offset: int, raw_data: BytesLike):
         self.entries: list[ItemInfoEntry] = []
         self.item_count: int = 0
         super().__init__(size, box_type, offset, raw_data)
@@ -401,78 +437,81 @@ class ItemInfoBox(FullBox):
         for child_box in self.children:
             if isinstance(child_box, ItemInfoEntryBox):
                 self.entries.append(
-                    ItemInfoEntry(child_box.item_id, child_box.item_type, child_box.item_name)
+                    ItemInfoEntry(child_box.item_id, child_box.item_type, source=child_box)
                 )
         
-        stream = self.raw_data[4:] 
+        stream = self.data_view[4:]
         try:
             if self.version == 0:
                 if len(stream) < 2: return 
-                self.item_count = struct.unpack('>H', stream[0:2])[0]
+                self.item_count = _U16.unpack_from(stream, 0)[0]
             else: 
                 if len(stream) < 4: return 
-                self.item_count = struct.unpack('>I', stream[0:4])[0]
+                self.item_count = _U32.unpack_from(stream, 0)[0]
         except struct.error:
-             print("Warning: Could not parse 'iinf' header. Content may be truncated.")
+             log.warning("Could not parse 'iinf' header. Content may be truncated.")
 
     def build_content(self) -> bytes:
-        header = BytesIO()
-        header.write(self.build_full_box_header()) 
-        
-        infe_children = [c for c in self.children if c.type == 'infe']
-        
-        if self.version == 0:
-            header.write(struct.pack('>H', len(infe_children)))
-        else: 
-            header.write(struct.pack('>I', len(infe_children)))
-            
-        # Call the grandparent implementation so nested boxes rebuild correctly.
-        children_data = super(FullBox, self).build_content()
+        return self.build_container_content([child.build_box() for child in self.children])
+
+    def build_container_content(self, children_data: list[bytes]) -> bytes:
+        infe_count = sum(1 for c in self.children if c.type == 'infe')
+        count_codec = _U16 if self.version == 0 else _U32
         
-        return header.getvalue() + children_data
+        # One join: header, entry count and children land in a single allocation.
+        return b''.join([self.build_full_box_header(), count_codec.pack(infe_count), *children_data])
 
 # PrimaryItemBox (`pitm`) --------------------------------------------------
 class PrimaryItemBox(FullBox):
-    def __init__(self, size: int, box_type: str, offset: int, raw_data: bytes):
-        self.item_id: int = 0
+    __slots__ = ('_item_id',)
+
+    item_id = _serialised_field('_item_id')
+
+    def __init__(self, size: int, box_type: str, offset: int, raw_data: BytesLike):
+        self._item_id: int = 0
         super().__init__(size, box_type, offset, raw_data)
 
     def _post_parse_initialization(self):
-        stream = self.raw_data[4:]
+        stream = self.data_view[4:]
         if not stream: return
         
         try:
             if self.version == 0:
-                self.item_id = struct.unpack('>H', stream[0:2])[0]
+                self._item_id = _U16.unpack_from(stream, 0)[0]
             else:
-                self.item_id = struct.unpack('>I', stream[0:4])[0]
+                self._item_id = _U32.unpack_from(stream, 0)[0]
         except struct.error:
-            print("Warning: Could not parse 'pitm' box.")
+            log.warning("Could not parse 'pitm' box.")
 
     def build_content(self) -> bytes:
         content = BytesIO()
         content.write(self.build_full_box_header()) 
         if self.version == 0:
-            content.write(struct.pack('>H', self.item_id))
+            content.write(_U16.pack(self.item_id))
         else:
-            content.write(struct.pack('>I', self.item_id))
+            content.write(_U32.pack(self.item_id))
         return content.getvalue()
 
 # ImageSpatialExtentsBox (`ispe`) -----------------------------------------
 class ImageSpatialExtentsBox(FullBox):
-    def __init__(self, size: int, box_type: str, offset: int, raw_data: bytes):
-        self.image_width: int = 0
-        self.image_height: int = 0
+    __slots__ = ('_image_width', '_image_height')
+
+    image_width = _serialised_field('_image_width')
+    image_height = _serialised_field('_image_height')
+
+    def __init__(self, size: int, box_type: str, offset: int, raw_data: BytesLike):
+        self._image_width: int = 0
+        self._image_height: int = 0
         super().__init__(size, box_type, offset, raw_data)
         
     def _post_parse_initialization(self):
-        stream = self.raw_data[4:]
+        stream = self.data_view[4:]
         if len(stream) < 8: return 
         try:
-            self.image_width = struct.unpack('>I', stream[0:4])[0]
-            self.image_height = struct.unpack('>I', stream[4:8])[0]
+            self._image_width = _U32.unpack_from(stream, 0)[0]
+            self._image_height = _U32.unpack_from(stream, 4)[0]
         except struct.error:
-            print("Warning: Could not parse 'ispe' box.")
+            log.warning("Could not parse 'ispe' box.")
         
     def __repr__(self):
         return f"<ImageSpatialExtentsBox width={self.image_width} height={self.image_height}>"
@@ -480,110 +519,77 @@ class ImageSpatialExtentsBox(FullBox):
     def build_content(self) -> bytes:
         content = BytesIO()
         content.write(self.build_full_box_header()) 
-        content.write(struct.pack('>I', self.image_width))
-        content.write(struct.pack('>I', self.image_height))
+        content.write(_U32.pack(self.image_width))
+        content.write(_U32.pack(self.image_height))
         return content.getvalue()
 
-# ItemPropertyAssociationEntry ---------------------------------------------
-class ItemPropertyAssociation:
-    def __init__(self, property_index: int, essential: bool):
-        self.property_index = property_index
-        self.essential = essential
-
-    def __repr__(self):
-        flag = '!' if self.essential else ''
-        return f"{flag}{self.property_index}"
-
-
-class ItemPropertyAssociationEntry:
-    def __init__(self, item_id, association_count):
-        self.item_id = item_id
-        self.association_count = association_count
-        self.associations: List[ItemPropertyAssociation] = []
-
-    def __repr__(self):
-        return (f"<ItemPropertyAssociationEntry item_id={self.item_id} "
-                f"associations={[repr(a) for a in self.associations]}>")
-
 # ItemPropertyAssociationBox (`ipma`) -------------------------------------
 class ItemPropertyAssociationBox(FullBox):
-    def __init__(self, size: int, box_type: str, offset: int, raw_data: bytes):
-        self.entries: dict[int, ItemPropertyAssociationEntry] = {}
+    __slots__ = ('_entries',)
+
+    def __init__(self, size: int, box_type: str, offset: int, raw_data: BytesLike):
+        self._entries: Optional[dict[int, ItemPropertyAssociationEntry]] = None
         super().__init__(size, box_type, offset, raw_data)
 
-    def _post_parse_initialization(self):
-        self._parse_associations()
+    @property
+    def entries(self) -> dict[int, ItemPropertyAssociationEntry]:
+        """Item ID -> associations, parsed from the payload on first access."""
+        if self._entries is None:
+            self._entries = self._parse_associations()
+        return self._entries
 
-    def _parse_associations(self):
-        stream = self.raw_data[4:]
-        if len(stream) < 4: return
-        
-        try:
-            entry_count = struct.unpack('>I', stream[0:4])[0]
-            pos = 4
-            item_id_size = 4 if self.version >= 1 else 2
-            is_large_property_index = (self.flags & 1) == 1
-            
-            for _ in range(entry_count):
-                if pos + item_id_size > len(stream): break
-                item_id = _read_int(stream, pos, item_id_size)
-                pos += item_id_size
-                
-                if pos + 1 > len(stream): break
-                association_count = stream[pos]
-                pos += 1
-                
-                entry = ItemPropertyAssociationEntry(item_id, association_count)
-                for __ in range(association_count):
-                    prop_size = 2 if is_large_property_index else 1
-                    if pos + prop_size > len(stream): break
-                    assoc_value = _read_int(stream, pos, prop_size)
-                    essential_flag = 0x8000 if prop_size == 2 else 0x80
-                    property_index = assoc_value & (0x7FFF if prop_size == 2 else 0x7F)
-                    is_essential = (assoc_value & essential_flag) != 0
-                    pos += prop_size
-                    if property_index > 0:
-                        entry.associations.append(
-                            ItemPropertyAssociation(property_index, is_essential)
-                        )
-                self.entries[item_id] = entry
-        except struct.error:
-            print("Warning: Failed to parse 'ipma' box. Content may be truncated.")
+    @entries.setter
+    def entries(self, value: dict[int, ItemPropertyAssociationEntry]):
+        self._entries = value
+
+    def _parse_associations(self) -> dict[int, ItemPropertyAssociationEntry]:
+        return parse_ipma(self.data_view[4:], self.version, self.flags)
 
     def build_content(self) -> bytes:
-        content = BytesIO()
-        content.write(self.build_full_box_header()) 
-        
-        content.write(struct.pack('>I', len(self.entries))) 
-        
+        # Dicts keep insertion order, so entries are emitted in parse order.
+        entries = self.entries
         item_id_size = 4 if self.version >= 1 else 2
         is_large_property_index = (self.flags & 1) == 1
+        prop_size = 2 if is_large_property_index else 1
+        mask = 0x7FFF if is_large_property_index else 0x7F
+        essential_flag = 0x8000 if is_large_property_index else 0x80
+        entry_header = _record_array_codec((item_id_size, 1), 1)
+        entry_header_size = item_id_size + 1
+
+        total_size = 4 + 4 + sum(
+            entry_header_size + len(entry.associations) * prop_size for entry in entries.values()
+        )
+        content = bytearray(total_size)
+        content[0:4] = self.build_full_box_header()
+        _U32.pack_into(content, 4, len(entries))
+        pos = 8
         
-        for item_id, entry in self.entries.items():
-            content.write(_write_int(item_id, item_id_size))
-            content.write(struct.pack('>B', len(entry.associations))) 
-            
-            for assoc in entry.associations:
-                prop_size = 2 if is_large_property_index else 1
-                mask = 0x7FFF if prop_size == 2 else 0x7F
-                essential_flag = 0x8000 if prop_size == 2 else 0x80
-                assoc_value = assoc.property_index & mask
-                if assoc.essential:
-                    assoc_value |= essential_flag
-                content.write(_write_int(assoc_value, prop_size))
+        for item_id, entry in entries.items():
+            associations = entry.associations
+            entry_header.pack_into(content, pos, item_id, len(associations))
+            pos += entry_header_size
+            if not associations:
+                continue
+            values = [
+                (assoc.property_index & mask) | (essential_flag if assoc.essential else 0)
+                for assoc in associations
+            ]
+            _record_array_codec((prop_size,), len(values)).pack_into(content, pos, *values)
+            pos += len(values) * prop_size
                 
-        return content.getvalue()
+        return bytes(content)
 
 # ItemPropertyContainerBox (`ipco`) ---------------------------------------
 class ItemPropertyContainerBox(Box):
+    __slots__ = ()
+
     def _post_parse_initialization(self):
         pass 
 
 # ItemPropertiesBox (`iprp`) ----------------------------------------------
 class ItemPropertiesBox(Box):
-    def _post_parse_initialization(self):
-        pass 
-        
+    __slots__ = ()
+
     @property
     def ipco(self) -> ItemPropertyContainerBox | None:
         for child in self.children:
@@ -597,6 +603,8 @@ class ItemPropertiesBox(Box):
 
 # ItemReferenceEntry -------------------------------------------------------
 class ItemReferenceEntry:
+    __slots__ = ('from_item_id', 'to_item_ids')
+
     def __init__(self, from_id, to_ids):
         self.from_item_id = from_id
         self.to_item_ids = to_ids
@@ -605,60 +613,54 @@ class ItemReferenceEntry:
 
 # ItemReferenceBox (`iref`) ------------------------------------------------
 class ItemReferenceBox(FullBox):
-    def __init__(self, size: int, box_type: str, offset: int, raw_data: bytes):
-        self.references: dict[str, dict[int, list[int]]] = {}
+    __slots__ = ('_references',)
+
+    def __init__(self, size: int, box_type: str, offset: int, raw_data: BytesLike):
+        self._references: Optional[dict[str, dict[int, list[int]]]] = None
         super().__init__(size, box_type, offset, raw_data)
 
-    def _post_parse_initialization(self):
-        self._parse_references_from_children()
-        
-    def _parse_references_from_children(self):
+    @property
+    def references(self) -> dict[str, dict[int, list[int]]]:
+        """Reference type -> from ID -> to IDs, materialised on first access."""
+        if self._references is None:
+            self._references = self._parse_references()
+        return self._references
+
+    def _parse_children(self) -> Iterator[tuple[str, tuple[int, list[int]] | None]]:
+        """Each child's type with its parsed `(from_id, to_ids)`, or None if unreadable."""
         item_id_size = 4 if self.version == 1 else 2
-
         for ref_box in self.children:
-            ref_box_type = ref_box.type
-            self.references[ref_box_type] = {}
-            
-            stream = ref_box.raw_data[4:] 
-            pos = 0
-            
-            if pos + item_id_size > len(stream):
-                print(f"Warning: Truncated 'iref' child box '{ref_box_type}'. Skipping.")
-                continue 
-
-            try:
-                if item_id_size == 4:
-                    from_item_id = struct.unpack('>I', stream[pos:pos+4])[0]
-                    pos += 4
-                else:
-                    from_item_id = struct.unpack('>H', stream[pos:pos+2])[0]
-                    pos += 2
-                
-                if pos + 2 > len(stream):
-                    print(f"Info: 'iref' child box '{ref_box_type}' for ID {from_item_id} has no references. Skipping.")
-                    self.references[ref_box_type][from_item_id] = [] 
-                    continue 
-                    
-                reference_count = struct.unpack('>H', stream[pos:pos+2])[0]
-                pos += 2
-            except struct.error as e:
-                print(f"Error parsing 'iref' child box '{ref_box_type}': {e}. Skipping.")
-                continue
-            
-            to_item_ids = []
-            for _ in range(reference_count):
-                if pos + item_id_size > len(stream): break
-                to_id = _read_int(stream, pos, item_id_size)
-                to_item_ids.append(to_id)
-                pos += item_id_size
-                
-            self.references[ref_box_type][from_item_id] = to_item_ids
+            # Children are plain boxes: the payload starts at `from_item_ID`.
+            yield ref_box.type, parse_iref_child(ref_box.data_view, ref_box.type, item_id_size)
+
+    def _parse_references(self) -> dict[str, dict[int, list[int]]]:
+        references: dict[str, dict[int, list[int]]] = {}
+        for ref_type, parsed in self._parse_children():
+            # Children of the same type share one mapping (e.g. several 'dimg' grids).
+            refs = references.setdefault(ref_type, {})
+            if parsed is not None:
+                from_item_id, to_item_ids = parsed
+                refs[from_item_id] = to_item_ids
+        return references
+
+    def iter_references(self) -> Iterator[tuple[str, int, list[int]]]:
+        """
+        Yield `(ref_type, from_id, to_ids)` without materialising `references`.
+
+        Nothing is cached: until `references` is first accessed, each call
+        decodes the current child boxes. After that, the (possibly edited)
+        dict is the source of truth and is iterated instead.
+        """
+        if self._references is not None:
+            for ref_type, refs in self._references.items():
+                for from_item_id, to_item_ids in refs.items():
+                    yield ref_type, from_item_id, to_item_ids
+            return
+
+        for ref_type, parsed in self._parse_children():
+            if parsed is not None:
+                yield ref_type, *parsed
 
     def build_content(self) -> bytes:
-        header = BytesIO()
-        header.write(self.build_full_box_header())
-        
-        # Preserve nested reference payloads by delegating to Box.build_content.
-        children_data = super(FullBox, self).build_content()
-        
-        return header.getvalue() + children_data
+        # Preserve nested reference payloads; they are rebuilt as child boxes.
+        return self.build_container_content([child.build_box() for child in self.children])
@@ -1,97 +1,115 @@
-import struct
+from functools import lru_cache
 from typing import List, BinaryIO
-from io import BytesIO
 
-from .base import Box, FullBox
+from .base import Box, BytesLike, FullBox, _U32, _U64
 from .heic_types import (
     ItemLocationBox, PrimaryItemBox, ItemInfoBox, ItemPropertiesBox,
     ItemPropertyContainerBox, ItemPropertyAssociationBox, ImageSpatialExtentsBox,
     ItemReferenceBox, ItemInfoEntryBox
 )
 
+# Dispatch tables are keyed by the raw 4CC so lookups run on the header bytes.
 BOX_TYPE_MAP = {
-    'iloc': ItemLocationBox,
-    'pitm': PrimaryItemBox,
-    'iinf': ItemInfoBox,
-    'iprp': ItemPropertiesBox,
-    'ipco': ItemPropertyContainerBox,
-    'ipma': ItemPropertyAssociationBox,
-    'ispe': ImageSpatialExtentsBox,
-    'iref': ItemReferenceBox,
-    'infe': ItemInfoEntryBox,
+    b'iloc': ItemLocationBox,
+    b'pitm': PrimaryItemBox,
+    b'iinf': ItemInfoBox,
+    b'iprp': ItemPropertiesBox,
+    b'ipco': ItemPropertyContainerBox,
+    b'ipma': ItemPropertyAssociationBox,
+    b'ispe': ImageSpatialExtentsBox,
+    b'iref': ItemReferenceBox,
+    b'infe': ItemInfoEntryBox,
 }
 
 # Boxes treated as containers (their payload should be parsed recursively).
-CONTAINER_BOXES = {'meta', 'moov', 'trak', 'iprp', 'ipco', 'dinf', 'fiinf', 'ipro', 'iinf', 'iref'}
+CONTAINER_BOXES = {b'meta', b'moov', b'trak', b'iprp', b'ipco', b'dinf', b'fiinf', b'ipro', b'iinf', b'iref'}
 # Boxes that should default to the `FullBox` implementation.
-FULL_BOXES = {'meta', 'hdlr', 'pitm', 'iinf', 'iloc', 'ipma', 'ispe', 'iref', 'infe'}
+FULL_BOXES = {b'meta', b'hdlr', b'pitm', b'iinf', b'iloc', b'ipma', b'ispe', b'iref', b'infe'}
+
+@lru_cache(maxsize=256)
+def _decode_box_type(raw: bytes) -> str:
+    """Decode a box 4CC; the few distinct types share one cached str each."""
+    return raw.decode('ascii', errors='ignore')
 
 def parse_boxes(stream: BinaryIO, max_size: int) -> List[Box]:
     """
     Parses boxes from a file stream up to a maximum size.
-    Now also handles recursive parsing.
+    The region is read once and handed to `parse_buffer`.
     """
-    boxes = []
     start_pos_in_stream = stream.tell()
-    
-    while stream.tell() - start_pos_in_stream < max_size:
-        current_offset_in_stream = stream.tell()
-        
-        header = stream.read(8)
-        if len(header) < 8: break
-
-        size = struct.unpack('>I', header[:4])[0]
-        box_type = header[4:].decode('ascii', errors='ignore')
-        
-        header_size = 8
-        if size == 1:
-            largesize_header = stream.read(8)
-            if len(largesize_header) < 8: break
-            size = struct.unpack('>Q', largesize_header)[0]
-            header_size = 16
-        elif size == 0:
-            size = max_size - (current_offset_in_stream - start_pos_in_stream)
-
-        if size < header_size: break
-            
-        content_size = size - header_size
-        
-        stream.seek(current_offset_in_stream + header_size)
-        raw_data = stream.read(content_size)
-        if len(raw_data) < content_size: break
-
-        box_class = BOX_TYPE_MAP.get(box_type, Box)
-        
-        if box_class == Box and box_type in FULL_BOXES:
-            box_class = FullBox
+    return parse_buffer(stream.read(max_size), base_offset=start_pos_in_stream)
+
+def parse_buffer(data: BytesLike, start: int = 0, base_offset: int = 0) -> List[Box]:
+    """
+    Parses boxes (recursively) from a bytes-like buffer, beginning at `start`.
+    Box payloads are zero-copy `memoryview` slices of `data`; reported
+    offsets are positions within `data` plus `base_offset`.
+    """
+    boxes: List[Box] = []
+    # Explicit work-list instead of recursion. Each frame walks one buffer:
+    # (view, next position, offset base, list to fill, container that owns it).
+    stack = [(memoryview(data), start, base_offset, boxes, None)]
+
+    while stack:
+        view, pos, frame_base, frame_boxes, owner = stack.pop()
+        end = len(view)
+        descended = False
+
+        while end - pos >= 8:
+            size = _U32.unpack_from(view, pos)[0]
+            type_bytes = bytes(view[pos + 4:pos + 8])
             
-        box = box_class(size, box_type, current_offset_in_stream, raw_data)
+            header_size = 8
+            if size == 1:
+                if end - pos < 16: break
+                size = _U64.unpack_from(view, pos + 8)[0]
+                header_size = 16
+            elif size == 0:
+                size = end - pos
+
+            if size < header_size: break
+            if pos + size > end: break
 
-        if box.type in CONTAINER_BOXES:
-            child_stream = BytesIO(box.raw_data)
-            parse_size = len(box.raw_data)
+            raw_data = view[pos + header_size:pos + size]
+
+            box_class = BOX_TYPE_MAP.get(type_bytes, Box)
             
-            if box.is_full_box:
-                # Skip the 4-byte version/flags prefix when recursing.
-                if parse_size >= 4:
-                    child_stream.read(4)
-                    parse_size -= 4
-
-                if box.type == 'iinf':
-                    if box.version == 0:
-                        if parse_size >= 2:
-                            child_stream.read(2)
-                            parse_size -= 2
-                    else:
-                        if parse_size >= 4:
-                            child_stream.read(4)
-                            parse_size -= 4
+            if box_class == Box and type_bytes in FULL_BOXES:
+                box_class = FullBox
                 
-            box.children = parse_boxes(child_stream, parse_size)
-            
-        box._post_parse_initialization()
+            box = box_class(size, _decode_box_type(type_bytes), frame_base + pos, raw_data)
+            frame_boxes.append(box)
+            pos += size
+
+            if type_bytes in CONTAINER_BOXES:
+                child_start = 0
+                parse_size = len(box.raw_data)
+                
+                if box.is_full_box:
+                    # Skip the 4-byte version/flags prefix when recursing.
+                    if parse_size >= 4:
+                        child_start += 4
+                        parse_size -= 4
+
+                    if type_bytes == b'iinf':
+                        entry_count_size = 2 if box.version == 0 else 4
+                        if parse_size >= entry_count_size:
+                            child_start += entry_count_size
+
+                # Resume this frame after the children; child offsets stay
+                # relative to the container payload.
+                stack.append((view, pos, frame_base, frame_boxes, owner))
+                stack.append((box.raw_data, child_start, 0, box.children, box))
+                descended = True
+                break
+
+            box._post_parse_initialization()
 
-        boxes.append(box)
-        stream.seek(current_offset_in_stream + size)
+        if not descended and owner is not None:
+            # Every child is parsed and initialised: finish the container.
+            owner._post_parse_initialization()
+            if owner.children:
+                # The children now own the payload; FullBoxes keep their version/flags prefix.
+                owner.raw_data = owner.raw_data[:4] if owner.is_full_box else b''
 
     return boxes
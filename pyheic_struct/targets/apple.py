@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import atexit
+import logging
 import struct
 import subprocess
+import threading
 from pathlib import Path
 
 from .base import TargetAdapter
 
+log = logging.getLogger(__name__)
+
+# TIFF IFD entry: tag, type, count, value/offset.
+_IFD_ENTRY = struct.Struct(">HHII")
+
 
 def _build_apple_maker_note(
     content_id: str,
@@ -74,7 +82,7 @@ def _build_apple_maker_note(
         if data_bytes is not None:
             data_bytes = bytes(data_bytes)
             value_offset = data_offset_base + len(variable_data)
-            payload.extend(struct.pack(">HHII", tag, entry_type, count, value_offset))
+            payload.extend(_IFD_ENTRY.pack(tag, entry_type, count, value_offset))
             variable_data.extend(data_bytes)
 
             # Maintain word alignment for TIFF payloads.
@@ -82,13 +90,73 @@ def _build_apple_maker_note(
                 variable_data.extend(b"\x00")
         else:
             value = int(entry["value"]) & 0xFFFFFFFF
-            payload.extend(struct.pack(">HHII", tag, entry_type, count, value))
+            payload.extend(_IFD_ENTRY.pack(tag, entry_type, count, value))
 
     payload.extend(struct.pack(">I", 0))  # next IFD offset
     payload.extend(variable_data)
     return bytes(payload)
 
 
+class _ExiftoolSession:
+    """
+    One long-lived `exiftool -stay_open` process shared by every MOV write,
+    so batch conversions pay exiftool's startup cost once instead of per file.
+    """
+
+    def __init__(self) -> None:
+        self._process: subprocess.Popen | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["exiftool", "-stay_open", "True", "-@", "-"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                # Errors share the pipe so they arrive before the `{ready}` sentinel.
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+            )
+        return self._process
+
+    def run(self, *args: str) -> str:
+        """Execute one argument list (one argument per line) and return its output."""
+        if any("\n" in arg for arg in args):
+            raise ValueError("exiftool -stay_open arguments cannot contain newlines.")
+
+        with self._lock:
+            process = self._ensure_started()
+            process.stdin.write("\n".join((*args, "-execute")) + "\n")
+            process.stdin.flush()
+
+            lines: list[str] = []
+            while True:
+                line = process.stdout.readline()
+                if not line:
+                    self._process = None
+                    raise RuntimeError("exiftool exited unexpectedly: " + "".join(lines).strip())
+                if line.rstrip() == "{ready}":
+                    return "".join(lines)
+                lines.append(line)
+
+    def close(self) -> None:
+        with self._lock:
+            process, self._process = self._process, None
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.stdin.write("-stay_open\nFalse\n")
+            process.stdin.flush()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+
+
+_EXIFTOOL = _ExiftoolSession()
+atexit.register(_EXIFTOOL.close)
+
+
 class AppleTargetAdapter(TargetAdapter):
     """
     将平面 HEIC 调整为苹果兼容格式，并在 MOV 中写入 ContentIdentifier。
@@ -102,12 +170,13 @@ class AppleTargetAdapter(TargetAdapter):
         if not flat_heic._ftyp_box:
             raise RuntimeError("Temporary HEIC file has no 'ftyp' box.")
 
-        print("Modifying 'ftyp' box to be Apple compatible (heic, MiHB, MiHE...)...")
+        log.debug("Modifying 'ftyp' box to be Apple compatible (heic, MiHB, MiHE...)...")
         flat_heic._ftyp_box.raw_data = self.APPLE_BRAND_PAYLOAD
         flat_heic._ftyp_box.size = len(self.APPLE_BRAND_PAYLOAD) + 8
+        flat_heic._ftyp_box.mark_dirty()
 
         if flat_heic.set_content_identifier(content_id):
-            print("Successfully set ContentIdentifier in flat HEIC.")
+            log.debug("Successfully set ContentIdentifier in flat HEIC.")
         else:
             raise RuntimeError("Failed to set ContentIdentifier in flat HEIC.")
 
@@ -118,27 +187,24 @@ class AppleTargetAdapter(TargetAdapter):
             capture_request_id=resolved_photo_id,
         )
         flat_heic.set_exif_maker_note(maker_note_payload)
-        print("Embedded Apple MakerNote metadata for Live Photo pairing.")
+        log.debug("Embedded Apple MakerNote metadata for Live Photo pairing.")
 
     def post_process_mov(self, mov_path: Path, content_id: str, inject_content_id: bool) -> None:
         if not inject_content_id or not mov_path.exists():
             return
 
         try:
-            print("Attempting to inject ContentIdentifier into .MOV file (requires exiftool)...")
-            subprocess.run(
-                [
-                    "exiftool",
-                    f"-QuickTime:ContentIdentifier={content_id}",
-                    "-overwrite_original",
-                    str(mov_path),
-                ],
-                check=True,
-                capture_output=True,
-                text=True,
+            log.debug("Attempting to inject ContentIdentifier into .MOV file (requires exiftool)...")
+            output = _EXIFTOOL.run(
+                f"-QuickTime:ContentIdentifier={content_id}",
+                "-overwrite_original",
+                "-charset",
+                "filename=utf8",
+                str(mov_path),
             )
-            print("Successfully injected ContentIdentifier into .MOV.")
+            if "1 image files updated" not in output:
+                raise RuntimeError(output.strip() or "exiftool did not update the file")
+            log.debug("Successfully injected ContentIdentifier into .MOV.")
         except Exception as exc:  # pragma: no cover - diagnostic path
-            print("Warning: Could not inject ContentIdentifier into .MOV.")
-            print("  (This is normal if 'exiftool' is not installed.)")
-            print(f"  Error: {exc}")
+            log.warning("Could not inject ContentIdentifier into .MOV "
+                        "(this is normal if 'exiftool' is not installed): %s", exc)
@@ -8,10 +8,9 @@ from __future__ import annotations
 
 import argparse
 import sys
+from io import BytesIO
 from pathlib import Path
 
-import pillow_heif
-
 from pyheic_struct import HEICBuilder, HEICFile
 
 
@@ -57,25 +56,21 @@ def _build_mpvd_box(video_bytes: bytes) -> bytes:
     return size.to_bytes(4, "big") + b"mpvd" + video_bytes
 
 
-def _prepare_base_heic(still_path: Path) -> tuple[HEICFile, Path]:
-    original = HEICFile(str(still_path))
-    pil_image = original.reconstruct_primary_image()
+def _prepare_base_heic(still_path: Path) -> HEICFile:
+    with HEICFile(str(still_path)) as original:
+        pil_image = original.reconstruct_primary_image()
     if pil_image is None:
         raise RuntimeError("Failed to reconstruct primary image from input HEIC.")
 
-    pillow_heif.register_heif_opener()
-    temp_flat_path = still_path.with_name(f"{still_path.stem}_temp_flat.heic")
-    if temp_flat_path.exists():
-        temp_flat_path.unlink()
-
+    flat_buffer = BytesIO()
     pil_image.save(
-        temp_flat_path,
+        flat_buffer,
         format="HEIF",
         quality=95,
         save_as_brand="mif1",
     )
 
-    heic = HEICFile(str(temp_flat_path))
+    heic = HEICFile.from_bytes(flat_buffer.getvalue())
 
     if heic._ftyp_box is None:
         raise RuntimeError("Input HEIC file does not contain an ftyp box.")
@@ -83,19 +78,15 @@ def _prepare_base_heic(still_path: Path) -> tuple[HEICFile, Path]:
     # Samsung Motion Photos use a minimal brand list (heic/mif1).
     heic._ftyp_box.raw_data = SAMSUNG_FTYP_PAYLOAD
     heic._ftyp_box.size = len(SAMSUNG_FTYP_PAYLOAD) + 8
+    heic._ftyp_box.mark_dirty()
 
-    return heic, temp_flat_path
+    return heic
 
 
 def convert_live_photo(still_path: Path, video_path: Path, output_path: Path) -> Path:
-    heic, temp_flat_path = _prepare_base_heic(still_path)
-
-    try:
+    with _prepare_base_heic(still_path) as heic:
         builder = HEICBuilder(heic)
         builder.write(str(output_path))
-    finally:
-        if temp_flat_path.exists():
-            temp_flat_path.unlink()
 
     video_bytes = video_path.read_bytes()
     if video_bytes[4:8] not in {b"ftyp", b"moov"}:
@@ -17,7 +17,7 @@ def inspect_file(filename: str):
     # 1. 打印厂商信息 (ftyp)
     if heic_file._ftyp_box:
         print(f"\n[ftyp] 厂商信息:")
-        print(f"  {heic_file._ftyp_box.raw_data}")
+        print(f"  {bytes(heic_file._ftyp_box.raw_data)}")
     
     # 2. 打印主图像 ID (pitm)
     primary_id = heic_file.get_primary_item_id()
@@ -32,17 +32,23 @@ def inspect_file(filename: str):
     if heic_file._iloc_box:
         print(f"\n[iloc] 项目位置 (片段) - 包含绝对偏移量:")
         locations = heic_file._iloc_box.locations
-        
+
         # 打印所有位置及其详细的 extents
+        # 瓦片很多时这里有上千行: 先收集, 最后一次性写出
+        lines = []
         for loc in locations:
             # 打印摘要
-            print(f"  {loc}") 
+            lines.append(f"  {loc}")
             # 打印关键的 extents (偏移量, 长度)
             if loc.extents:
-                for extent in loc.extents:
-                    print(f"    -> (offset={extent[0]}, length={extent[1]})")
+                lines.extend(
+                    f"    -> (offset={offset}, length={length})"
+                    for offset, length in loc.extents
+                )
             else:
-                print("    -> (No extents found)")
+                lines.append("    -> (No extents found)")
+        if lines:
+            sys.stdout.write('\n'.join(lines) + '\n')
     
     # 5. 打印项目关联 (iref)
     if heic_file._iref_box:
@@ -7,6 +7,7 @@ Apple-compatible Live Photo pairs (HEIC + MOV) with matching ContentIdentifier.
 from __future__ import annotations
 
 import argparse
+import logging
 import shutil
 import sys
 from pathlib import Path
@@ -50,11 +51,23 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Skip writing ContentIdentifier into the MOV (no exiftool usage).",
     )
+    parser.add_argument(
+        "--keep-tiles",
+        action="store_true",
+        help="Reuse the original coded image tiles instead of decoding and re-encoding the photo.",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Print the step-by-step conversion and rebuild log.",
+    )
     return parser
 
 
 def main(argv: list[str] | None = None) -> int:
     args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
 
     source_path = args.source.expanduser().resolve()
     if not source_path.is_file():
@@ -89,6 +102,7 @@ def main(argv: list[str] | None = None) -> int:
         output_still=heic_output,
         output_video=mov_output,
         inject_content_id_into_mov=not args.skip_mov_tag,
+        reencode_primary=not args.keep_tiles,
     )
 
     print("Conversion finished successfully.")